@@ -1,26 +1,766 @@
 """Web crawling and scraping
 """
 
+import asyncio
+import functools
+import gc
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 
 from woodstock.util import utility
+from woodstock.util.pipeline import Pipeline, Stage
+from woodstock.util.workqueue import WorkQueue, default_owner
 
 BASE_URL = 'https://www.imdb.com/'
 
+# lxml is optional; if it is installed, it is the faster of the parsers that BeautifulSoup can use
+try:
+    import lxml
+    FAST_PARSER = 'lxml'
+except ImportError:
+    FAST_PARSER = 'html.parser'
+
+# Targeted parsing of IMDb movie lists: only the movie headers, the poster divs
+# and the description of the list (with the total number of movies) are built as tree nodes
+M_INFO_STRAINER = SoupStrainer(['h3', 'div'], class_=['lister-item-header', 'lister-item-image ribbonize', 'desc'])
+
+# (connect timeout, read timeout) of each request, in seconds
+DEFAULT_TIMEOUT = (3.05, 30)
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (compatible; woodstock-crawler)',
+                   'Accept-Language': 'en-US,en;q=0.8'}
+
+
+def _write_atomic(file, data):
+    """Writes data (bytes) to file via a temporary file in the same directory and os.replace(),
+    so that other threads and processes see either the old or the new content, never a partial one.
+    """
+
+    with tempfile.NamedTemporaryFile(dir=file.parent, prefix=file.name, suffix='.tmp', delete=False) as f:
+        f.write(data)
+    try:
+        os.replace(f.name, file)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+
+def _remove(file):
+    """Removes file if it exists (Path.unlink(missing_ok=True) is available only from Python 3.8).
+    """
+
+    try:
+        os.remove(file)
+    except FileNotFoundError:
+        pass
+
+
+class CachedResponse:
+    """The class describing a response stored in (or served from) a ResponseCache or a CrawlArchive.
+    Has the fields and methods of requests.Response that the crawler uses
+    (url, status_code, headers, content, encoding, text, iter_content(), raise_for_status(), with-statement),
+    plus the time when the response was stored or last revalidated.
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding='utf-8', stored=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.stored = stored if stored is not None else time.time()
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        content = self.text if decode_unicode else self.content
+        for i in range(0, len(content), chunk_size):
+            yield content[i:i + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error for url: {self.url}', response=self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class ResponseCache:
+    """Persistent (on-disk) HTTP response cache, used by a Fetcher before hitting the network.
+    Each response is stored as two files named after the SHA-256 hash of its URL:
+    <hash>.body (the response content) and <hash>.json (URL, status, headers, encoding, storage time and
+    the SHA-256 hash of the content, so that a body and a meta file that do not match are not served).
+    - responses younger than ttl seconds are served without any request
+    - older responses are revalidated with a conditional request (If-None-Match/If-Modified-Since,
+      from the stored ETag/Last-Modified headers); a 304 response means that the stored content is still valid
+    - when the total size of the stored bodies exceeds max_bytes, the least recently used responses are evicted
+      (the modification time of a .body file is its last access time); the total size is kept as a running total,
+      so the cache directory is scanned only when the cache is first used and when responses are evicted
+    """
+
+    def __init__(self, directory=None, ttl=3600, max_bytes=100 * 1024 * 1024):
+        self.directory = Path(directory) if directory else utility.get_data_dir() / 'http_cache'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._size = None                                               # the total size of the stored bodies
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.directory / (key + '.json'), self.directory / (key + '.body')
+
+    def get(self, url):
+        """Returns the CachedResponse stored for url, or None if there is no such a response.
+        """
+
+        meta_file, body_file = self._paths(url)
+        with self._lock:
+            try:
+                meta = json.loads(meta_file.read_text(encoding='utf-8'))
+                content = body_file.read_bytes()
+                if hashlib.sha256(content).hexdigest() != meta.get('sha256'):
+                    return None                                         # e.g., interrupted by a crash
+                os.utime(body_file)                                     # mark as recently used
+            except (OSError, ValueError):
+                return None
+        return CachedResponse(url, meta['status_code'], meta['headers'], content, meta['encoding'], meta['stored'])
+
+    def is_fresh(self, cached):
+        return time.time() - cached.stored < self.ttl
+
+    @staticmethod
+    def validators(cached):
+        """Returns the headers for revalidating cached with a conditional request.
+        """
+
+        headers = {}
+        if cached is not None and 'ETag' in cached.headers:
+            headers['If-None-Match'] = cached.headers['ETag']
+        if cached is not None and 'Last-Modified' in cached.headers:
+            headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        return headers
+
+    def put(self, url, response):
+        """Stores response (a requests.Response or a CachedResponse) for url and returns the CachedResponse.
+        """
+
+        cached = CachedResponse(url, response.status_code, dict(response.headers), response.content,
+                                response.encoding or getattr(response, 'apparent_encoding', None) or 'utf-8')
+        self._write(cached)
+        self.evict()
+        return cached
+
+    def refresh(self, cached):
+        """Marks cached as fresh again (after a 304 response), without changing its content.
+        """
+
+        cached.stored = time.time()
+        self._write(cached)
+        return cached
+
+    def _write(self, cached):
+        meta_file, body_file = self._paths(cached.url)
+        meta = {'url': cached.url, 'status_code': cached.status_code, 'headers': dict(cached.headers),
+                'encoding': cached.encoding, 'stored': cached.stored,
+                'sha256': hashlib.sha256(cached.content).hexdigest()}
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            try:
+                self._size -= body_file.stat().st_size
+            except OSError:
+                pass
+            _write_atomic(body_file, cached.content)
+            _write_atomic(meta_file, json.dumps(meta).encode('utf-8'))
+            self._size += len(cached.content)
+
+    def _scan(self):
+        bodies = []
+        for f in self.directory.glob('*.body'):
+            try:
+                stat = f.stat()
+            except OSError:                                             # e.g., evicted by another process
+                continue
+            bodies.append((stat.st_mtime, stat.st_size, f))
+        return bodies
+
+    def evict(self):
+        """Removes the least recently used responses until the total size of the stored bodies is within max_bytes.
+        """
+
+        with self._lock:
+            if self._size is not None and self._size <= self.max_bytes:
+                return
+            bodies = self._scan()
+            total = sum(size for _, size, _ in bodies)
+            for _, size, body_file in sorted(bodies):
+                if total <= self.max_bytes:
+                    break
+                _remove(body_file)
+                _remove(body_file.with_suffix('.json'))
+                total -= size
+            self._size = total
+
+    def clear(self):
+        with self._lock:
+            for f in self.directory.glob('*.*'):
+                _remove(f)
+            self._size = 0
+
+
+class RateLimiter:
+    """Per-host token bucket rate limiter, with an adaptive rate (additive increase, multiplicative decrease).
+    Each host has its own bucket that fills with rate tokens per second, up to burst tokens;
+    each request to the host takes a token, waiting for one if the bucket is empty.
+    Each successful request increases the host's rate by increase (up to max_rate),
+    and each throttled request (429, 5xx) multiplies it by decrease (down to min_rate),
+    so that the rate settles just under the host's throttle threshold.
+    """
+
+    def __init__(self, rate=5.0, burst=5, min_rate=0.5, max_rate=50.0, increase=0.1, decrease=0.5):
+        self.initial_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self._buckets = {}                                      # host -> [tokens, time of last refill, rate]
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = [self.burst, time.monotonic(), self.initial_rate]
+        return self._buckets[host]
+
+    def acquire(self, url):
+        """Blocks until a request to the host of url is allowed.
+        """
+
+        while True:
+            with self._lock:
+                bucket = self._bucket(url)
+                now = time.monotonic()
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * bucket[2])
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return
+                wait = (1 - bucket[0]) / bucket[2]
+            time.sleep(wait)
+
+    def succeeded(self, url):
+        with self._lock:
+            bucket = self._bucket(url)
+            bucket[2] = min(self.max_rate, bucket[2] + self.increase)
+
+    def throttled(self, url):
+        with self._lock:
+            bucket = self._bucket(url)
+            bucket[2] = max(self.min_rate, bucket[2] * self.decrease)
+            bucket[0] = min(bucket[0], 0)                       # no burst right after being throttled
+
+    def rate(self, url):
+        with self._lock:
+            return self._bucket(url)[2]
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CrawlTelemetry:
+    """Instrumentation of crawls: an event stream plus its aggregates.
+    A Fetcher with a CrawlTelemetry emits the events of the pages it gets, get_soup() and get_m_info() add theirs;
+    each event is a dictionary passed to each of the callbacks (e.g., print, or <list>.append), and is aggregated
+    for summary(). The events:
+    - 'fetch': url, status, bytes, cached (1 if the content was served from the Fetcher's ResponseCache, either fresh
+               or revalidated by a 304 response), wait (seconds from sending the request to getting the response
+               headers, including DNS lookup, connecting and TLS handshake if a new connection is opened;
+               requests does not report them separately), transfer (seconds of downloading the content,
+               and of any failed attempts)
+    - 'retry': url, status (None for a connection error), delay (seconds)
+    - 'parse': url, parse (seconds of building the BeautifulSoup object), parser
+    - 'extract': page, items (the number of 4-tuples), extract (seconds of get_m_info_from_soup(), or, in a crawl
+                 with a ParseCache, of getting the page's 4-tuples from the cache or of parsing and extracting them),
+                 parse_cached (only in a crawl with a ParseCache: 1 if the 4-tuples came from the cache)
+    - 'summary': the summary() of the events of a get_m_info() call (see snapshot()), at its end, plus start_url
+                 (and the MemoryGuard's summary(), if get_m_info() is given one)
+    """
+
+    def __init__(self, *callbacks):
+        self.callbacks = list(callbacks)
+        self.start = time.perf_counter()
+        self.counts = Counter()                                 # event -> the number of events
+        self.totals = Counter()                                 # field -> the sum of its values over the events
+        self.statuses = Counter()
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        fields = {'event': event, **fields}
+        with self._lock:
+            self.counts[event] += 1
+            for key in ('bytes', 'cached', 'wait', 'transfer', 'delay', 'parse', 'items', 'extract'):
+                if isinstance(fields.get(key), (int, float)):
+                    self.totals[key] += fields[key]
+            if event == 'fetch':
+                self.statuses[fields['status']] += 1
+        for callback in self.callbacks:
+            callback(fields)
+
+    def snapshot(self):
+        """Returns the aggregates so far, to be passed to summary() as since.
+        """
+
+        with self._lock:
+            return {'counts': Counter(self.counts), 'totals': Counter(self.totals),
+                    'statuses': Counter(self.statuses), 'time': time.perf_counter()}
+
+    def summary(self, since=None):
+        """Returns the aggregates of the events so far, or of the events since the snapshot() since, if specified
+        (e.g., of one crawl of a Fetcher that is reused; the events of concurrent crawls are not told apart),
+        including the likely bottleneck of the crawl:
+        'network' (wait + transfer), 'parser' (parse + extract) or 'throttling' (retry delays).
+        """
+
+        with self._lock:
+            counts = Counter(self.counts)
+            t = Counter(self.totals)
+            statuses = Counter(self.statuses)
+        start = self.start
+        if since is not None:
+            counts, t, statuses = counts - since['counts'], t - since['totals'], statuses - since['statuses']
+            start = since['time']
+        counts, t, statuses = dict(counts), dict(t), dict(statuses)
+        times = {'network': t.get('wait', 0) + t.get('transfer', 0),
+                 'parser': t.get('parse', 0) + t.get('extract', 0),
+                 'throttling': t.get('delay', 0)}
+        return {'pages': counts.get('fetch', 0), 'cached': t.get('cached', 0), 'bytes': t.get('bytes', 0),
+                'items': t.get('items', 0), 'retries': counts.get('retry', 0), 'statuses': statuses,
+                'wait': round(t.get('wait', 0), 3), 'transfer': round(t.get('transfer', 0), 3),
+                'retry_delay': round(t.get('delay', 0), 3), 'parse': round(t.get('parse', 0), 3),
+                'extract': round(t.get('extract', 0), 3), 'elapsed': round(time.perf_counter() - start, 3),
+                'bottleneck': max(times, key=times.get) if any(times.values()) else None}
+
+
+class Fetcher:
+    """The class that fetches Web pages over a pooled, keep-alive requests.Session,
+    so that the TCP (and TLS) connections are reused from one page to the next.
+    A Fetcher can be passed to get_soup(), get_next_soup(), crawl(), get_m_info() and their variants;
+    it can also be used as a context manager, which closes the session (and its connections) on exit.
+    Parameters:
+    - pool_size: the max number of connections kept alive per host (use at least max_workers of a concurrent crawl)
+    - headers: the headers sent with each request, in addition to (or overriding) DEFAULT_HEADERS
+    - timeout: the requests timeout, either a number of seconds or a (connect timeout, read timeout) tuple
+    - cache: the ResponseCache to consult before hitting the network (optional)
+    - recorder: the CrawlArchive to record each response got by get() to (optional; streams are not recorded)
+    - parser: the parser that get_soup() uses for the pages got by this Fetcher ('html.parser', 'lxml',...)
+    - targeted: if True, get_soup() builds only the nodes needed by get_m_info_from_soup() (see M_INFO_STRAINER)
+    - rate_limiter: the RateLimiter shared by the requests of this Fetcher (optional)
+    - retries: the max number of retries of a request that fails with a connection error or RETRY_STATUS_CODES;
+               the retries are delayed by exponential backoff with full jitter (a random delay between 0 and
+               backoff * 2**<retry number> seconds), or as requested by the Retry-After header;
+               when the retries are exhausted, requests.HTTPError (or the connection error) is raised,
+               instead of returning the error page as if it were a regular one
+    - hedge_percentile: if specified (e.g., 95), a request that takes longer than this percentile of the latencies
+                        of the recent requests is hedged, i.e. duplicated, and the first of the two responses is used;
+                        hedging starts after hedge_min_samples requests (streams are never hedged);
+                        the latency is counted from when a request is sent, and the duplicate request
+                        takes its own token from the rate limiter (if any)
+    - telemetry: the CrawlTelemetry that gets the events of this Fetcher's requests (optional)
+    """
+
+    def __init__(self, pool_size=10, headers=None, timeout=DEFAULT_TIMEOUT, cache=None,
+                 parser='html.parser', targeted=False, rate_limiter=None, retries=3, backoff=0.5, recorder=None,
+                 hedge_percentile=None, hedge_min_samples=20, telemetry=None):
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.headers.update(headers or {})
+        self.timeout = timeout
+        self.cache = cache
+        self.parser = parser
+        self.targeted = targeted
+        self.rate_limiter = rate_limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.recorder = recorder
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = deque(maxlen=200)                      # of the recent responses, in seconds
+        self.hedged = 0                                         # the number of hedged requests so far
+        self._hedge_pool = None
+        self.telemetry = telemetry
+        self._retry_delays = threading.local()                  # the retry delays of the current thread's request
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        """Returns the Response object from HTTP GET request to url, sent over the pooled session.
+        Like get_soup(), assumes that no redirection is allowed, unless specified otherwise in kwargs.
+        If the Fetcher has a cache, a fresh cached response is returned without any request,
+        and a stale one is revalidated with a conditional request.
+        If the Fetcher has a recorder, the response is recorded to it.
+        """
+
+        start = time.perf_counter()
+        response, cached, sent = self._get_cached(url, **kwargs)
+        if self.telemetry is not None:
+            total = time.perf_counter() - start
+            # A ReplayFetcher's responses have no elapsed time
+            wait = sent.elapsed.total_seconds() if sent is not None and hasattr(sent, 'elapsed') else 0
+            transfer = max(total - wait - getattr(self._retry_delays, 'total', 0), 0)
+            self.telemetry.emit('fetch', url=url, status=response.status_code, bytes=len(response.content),
+                                cached=int(cached), wait=wait, transfer=transfer)
+        if self.recorder is not None:
+            self.recorder.record(url, response)
+        return response
+
+    def _get_cached(self, url, **kwargs):
+        """Returns the response, whether its content comes from the cache, and the response of the request sent
+        over the network (None if no request was sent), as a 3-tuple.
+        """
+
+        if self.cache is None:
+            response = self._get(url, **kwargs)
+            return response, False, response
+
+        cached = self.cache.get(url)
+        if cached is not None and self.cache.is_fresh(cached):
+            return cached, True, None
+        kwargs['headers'] = {**ResponseCache.validators(cached), **kwargs.get('headers', {})}
+        response = self._get(url, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            return self.cache.refresh(cached), True, response
+        if response.status_code == 200:
+            return self.cache.put(url, response), False, response
+        return response, False, response
+
+    def _get(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.timeout)
+        self._retry_delays.total = 0
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            try:
+                response = self._send(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                response = None
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.succeeded(url)
+                return response
+            if response is not None:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.throttled(url)
+                if attempt >= self.retries:
+                    response.raise_for_status()
+            delay = self._retry_delay(response, attempt)
+            self._retry_delays.total += delay
+            if self.telemetry is not None:
+                self.telemetry.emit('retry', url=url, status=response.status_code if response is not None else None,
+                                    delay=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, url, **kwargs):
+        """Sends the request over the session, hedging it if it is slower than the hedging threshold,
+        and records the latency of the response that is used (from the moment its request was actually sent).
+        """
+
+        response, start = self._hedged_get(url, **kwargs)
+        with self._lock:
+            self.latencies.append(time.perf_counter() - start)
+        return response
+
+    def _timed_get(self, url, started=None, **kwargs):
+        """Returns the response to url and the time when the request was sent; sets the event started (if any) then.
+        """
+
+        start = time.perf_counter()
+        if started is not None:
+            started.set()
+        return self.session.get(url, **kwargs), start
+
+    def _hedged_get(self, url, **kwargs):
+        threshold = self.hedge_threshold()
+        if threshold is None or kwargs.get('stream'):
+            return self._timed_get(url, **kwargs)
+
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=self.pool_size)
+        started = threading.Event()
+        first = self._hedge_pool.submit(self._timed_get, url, started, **kwargs)
+        # The threshold is counted from when the request is sent, not from when it is queued in the hedge pool
+        # (under load, a request waiting for a free thread of the pool is not slow)
+        while not started.wait(0.05) and not first.done():
+            pass
+        done, pending = wait({first}, timeout=threshold)
+        if not done:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)                  # the duplicate is a request of its own
+            with self._lock:
+                self.hedged += 1
+            pending.add(self._hedge_pool.submit(self._timed_get, url, **kwargs))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        # Use the first successful response; if the first one failed, wait for the other one
+        first = done.pop()
+        if first.exception() is not None and pending:
+            return pending.pop().result()
+        return first.result()
+
+    def hedge_threshold(self):
+        """Returns the latency (in seconds) after which a request is hedged, or None if requests are not hedged.
+        """
+
+        with self._lock:
+            if self.hedge_percentile is None or len(self.latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[int(self.hedge_percentile / 100 * (len(latencies) - 1))]
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+        if retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def stream(self, url, **kwargs):
+        """Returns the Response object from HTTP GET request to url, with the content to be read as a stream
+        (<response>.iter_content()); the cache is not used for streams.
+        """
+
+        return self._get(url, stream=True, **kwargs)
+
+    def close(self):
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CrawlArchive:
+    """Append-only archive of the responses of crawl sessions, in a single file in the data directory
+    (data/crawl_archive.bin by default), for deterministic, offline re-runs of crawls (see ReplayFetcher).
+    Each response is appended as a JSON header line {"url", "status_code", "headers", "encoding", "length"},
+    followed by length bytes of the zlib-compressed response content. The url is the URL as requested
+    (not <response>.url, which requests has requoted and normalized), so that the replayed requests find it.
+    An index {URL: (offset, header)} of the latest response for each URL is built when the archive is opened;
+    an incomplete last response (e.g., after a crash) is cut off.
+    """
+
+    def __init__(self, file=None):
+        self.file = Path(file) if file else utility.get_data_dir() / 'crawl_archive.bin'
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.file.touch()
+        self.index = {}
+        self._lock = threading.Lock()
+        with self.file.open('r+b') as f:
+            while True:
+                offset = f.tell()
+                try:
+                    header = json.loads(f.readline())
+                except ValueError:
+                    header = None
+                if header is None or f.seek(header['length'], os.SEEK_CUR) > self.file.stat().st_size:
+                    f.truncate(offset)
+                    break
+                self.index[header['url']] = (f.tell() - header['length'], header)
+
+    def __contains__(self, url):
+        return url in self.index
 
-def get_soup(url: str) -> BeautifulSoup:
+    def __len__(self):
+        return len(self.index)
+
+    def record(self, url, response):
+        """Appends response (a requests.Response or a CachedResponse) to the request for url to the archive.
+        """
+
+        content = zlib.compress(response.content)
+        header = {'url': url, 'status_code': response.status_code, 'headers': dict(response.headers),
+                  'encoding': response.encoding or getattr(response, 'apparent_encoding', None) or 'utf-8',
+                  'length': len(content)}
+        with self._lock:
+            with self.file.open('ab') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                offset = f.tell()
+                f.write(content)
+            self.index[url] = (offset, header)
+
+    def get(self, url):
+        """Returns the latest response recorded for url as a CachedResponse, or None if there is no such a response.
+        """
+
+        if url not in self.index:
+            return None
+        offset, header = self.index[url]
+        with self.file.open('rb') as f:
+            f.seek(offset)
+            content = zlib.decompress(f.read(header['length']))
+        return CachedResponse(url, header['status_code'], header['headers'], content, header['encoding'])
+
+
+class ReplayFetcher(Fetcher):
+    """A Fetcher that serves all the responses from a CrawlArchive, without any network access.
+    The URLs that are not in the archive get an empty 404 response, as if they were missing from the site.
+    """
+
+    def __init__(self, archive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def _get(self, url, **kwargs):
+        response = self.archive.get(url)
+        return response if response is not None else CachedResponse(url, 404, {}, b'')
+
+
+def get_response(url: str, fetcher=None):
+    """Returns the Response object from HTTP GET request to url, using requests.get(<url string>, allow_redirects=False)
+    with DEFAULT_TIMEOUT, or fetcher.get(<url string>) if a Fetcher is passed.
+    """
+
+    return requests.get(url, allow_redirects=False, timeout=DEFAULT_TIMEOUT) if fetcher is None else fetcher.get(url)
+
+
+def get_soup(url: str, fetcher=None, parser=None, parse_only=None) -> BeautifulSoup:
     """Returns BeautifulSoup object from the corresponding URL, passed as a string.
-    Creates Response object from HTTP GET request, using requests.get(<url string>, allow_redirects=False),
+    Creates Response object from HTTP GET request, using requests.get(<url string>, allow_redirects=False)
+    or fetcher.get(<url string>) if a Fetcher is passed,
     and then uses the text field of the Response object and the 'html.parser' to create the BeautifulSoup object.
+    The parser ('html.parser' by default, or the Fetcher's parser) and a SoupStrainer to parse only a part
+    of the page (none by default, or M_INFO_STRAINER for a targeted Fetcher) can be specified explicitly.
     """
 
     # Create Response object from HTTP GET request; assume that no redirection is allowed
-    response = requests.get(url, allow_redirects=False)
+    response = get_response(url, fetcher)
+    return _make_soup(url, response, fetcher, parser, parse_only)
+
+
+def _make_soup(url, response, fetcher=None, parser=None, parse_only=None):
+    """Returns the BeautifulSoup object of the Response object of url, as get_soup() (with its parse telemetry).
+    """
+
+    parser, parse_only = _parse_options(fetcher, parser, parse_only)
     # Get text from the Response object
     response_text = response.text
-    # Create and return the corresponding BeautifulSoup object from the response text; use 'html.parser'
-    return BeautifulSoup(response_text, 'html.parser')
+    # Create and return the corresponding BeautifulSoup object from the response text; use 'html.parser' by default
+    if fetcher is None or fetcher.telemetry is None:
+        return BeautifulSoup(response_text, parser, parse_only=parse_only)
+    start = time.perf_counter()
+    soup = BeautifulSoup(response_text, parser, parse_only=parse_only)
+    fetcher.telemetry.emit('parse', url=url, parse=time.perf_counter() - start, parser=parser)
+    return soup
+
+
+def _parse_options(fetcher, parser, parse_only):
+    if parser is None:
+        parser = fetcher.parser if fetcher is not None else 'html.parser'
+    if parse_only is None and fetcher is not None and fetcher.targeted:
+        parse_only = M_INFO_STRAINER
+    return parser, parse_only
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: while a call for a key is in flight,
+    the other callers with the same key (threads or coroutines) wait for it and share its result (or exception),
+    instead of making the same call again. Once the call completes, the next call with that key is made anew.
+    """
+
+    def __init__(self):
+        self._calls = {}                                        # key -> concurrent.futures.Future of the call
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """Returns function(*args, **kwargs), or the result of the call with the same key already in flight.
+        """
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key, function, *args, **kwargs):
+        """Asynchronous counterpart of do(), for a blocking function (run in the event loop's default executor).
+        Coalesces with the calls in flight from both threads and other coroutines.
+        """
+
+        with self._lock:
+            future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.wrap_future(future)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.do, key, function, *args, **kwargs))
+
+
+_soup_flight = SingleFlight()
+
+
+def get_soup_coalesced(url: str, fetcher=None, parser=None, parse_only=None) -> BeautifulSoup:
+    """Single-flight counterpart of get_soup(): concurrent callers asking for the same URL (with the same parsing
+    options) share one in-flight request and one BeautifulSoup object, which they should therefore not modify.
+    """
+
+    parser, parse_only = _parse_options(fetcher, parser, parse_only)
+    return _soup_flight.do((url, parser, id(parse_only)), get_soup, url, fetcher, parser, parse_only)
+
+
+async def get_soup_coalesced_async(url: str, fetcher=None, parser=None, parse_only=None) -> BeautifulSoup:
+    """Asynchronous counterpart of get_soup_coalesced(), coalesced with both threads and coroutines.
+    """
+
+    parser, parse_only = _parse_options(fetcher, parser, parse_only)
+    return await _soup_flight.do_async((url, parser, id(parse_only)), get_soup, url, fetcher, parser, parse_only)
 
 
 def get_specific_page(start_url: str, page=1):
@@ -31,61 +771,160 @@ def get_specific_page(start_url: str, page=1):
     return ''.join(url_chunks) + '&page=' + str(page)
 
 
-def get_next_soup(start_url: str, page=1):
+def get_next_soup(start_url: str, page=1, fetcher=None):
     """Returns the BeautifulSoup object corresponding to a specific page
     in case there are multiple pages that list objects of interest.
     Parameters:
     - start_url: the starting page/url of a multi-page list of objects
     - page: the page number of a specific page of a multi-page list of objects
+    - fetcher: the Fetcher to get the page with (optional, see get_soup())
     """
 
-    return get_soup(get_specific_page(start_url, page))
+    return get_soup(get_specific_page(start_url, page), fetcher)
+
+
+def get_page_count(soup: BeautifulSoup):
+    """Returns the number of pages of a multi-page IMDb movie list, computed from the description of the list
+    on its first page (e.g., '1-50 of 2,345 titles.'), or None if the page has no such a description.
+    """
+
+    desc = soup.find('div', {'class': 'desc'})
+    return _parse_page_count(desc.text) if desc else None
+
 
+def _parse_page_count(desc_text):
+    match = re.search(r'([\d,]+)-([\d,]+) of ([\d,]+)', desc_text)
+    if not match:
+        return None
+    first, last, total = (int(n.replace(',', '')) for n in match.groups())
+    if last < first:                                            # a page beyond the end (e.g., '51-50 of 50 titles.')
+        return None
+    return math.ceil(total / (last - first + 1))
 
-def crawl(url: str, max_pages=1):
+
+def has_movies(soup: BeautifulSoup):
+    return soup.find('h3', {'class': "lister-item-header"}) is not None
+
+
+def crawl(url: str, max_pages=1, fetcher=None, prefetch=0):
     """Web crawler that collects info about movies from IMDb,
     implemented as a Python generator that yields BeautifulSoup objects (get_next_soup()) from multi-page movie lists.
-    Parameters: the url of the starting IMDb page and the max number of pages to crawl in case of multi-page lists.
+    Parameters: the url of the starting IMDb page, the max number of pages to crawl in case of multi-page lists,
+    (optionally) the Fetcher to get the pages with, and the number of pages to prefetch.
+    The number of pages of the list is read from the first page (get_page_count()), so the crawler stops
+    at the last page of the list even if max_pages is greater; it also stops after a page with no movies.
+    If prefetch > 0, the next prefetch pages are fetched in background threads while the consumer is still busy
+    with the current page, so the consumer's processing and the fetching of the next pages overlap.
     """
 
-    page = 1
-    while page <= max_pages:
-        yield get_next_soup(url, page)
-        page += 1
+    if max_pages < 1:
+        return
+    soup = get_next_soup(url, 1, fetcher)
+    last_page = min(max_pages, get_page_count(soup) or max_pages)
+
+    if not prefetch:
+        page = 1
+        while page <= last_page:
+            if page > 1:
+                soup = get_next_soup(url, page, fetcher)
+            # Checked before yielding, since the consumer may destroy the soup (e.g., iter_m_info())
+            last = not has_movies(soup)
+            yield soup
+            if last:
+                break
+            page += 1
+        return
+
+    with ThreadPoolExecutor(max_workers=prefetch) as executor:
+        pending = deque()
+        next_page = 2
+        try:
+            while True:
+                # Keep prefetch pages in flight while the consumer processes the current page
+                while next_page <= last_page and len(pending) < prefetch:
+                    pending.append(executor.submit(get_next_soup, url, next_page, fetcher))
+                    next_page += 1
+                last = not has_movies(soup)
+                yield soup
+                if not pending or last:
+                    break
+                soup = pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
 
 
-def get_m_info(start_url: str, max_pages=1):
+def _map_ordered(executor, function, items, timeout=None, window=None):
+    """Like <executor>.map(), yields the results of function for items in the order of items;
+    when the caller stops consuming them (or an exception is raised), the calls not yet started are cancelled
+    (<executor>.shutdown(cancel_futures=True) does the same, but only from Python 3.9).
+    If window is specified, at most window calls are submitted at a time, and the next one only when the caller
+    asks for the next result, so a caller that pauses (e.g., MemoryGuard.check()) pauses the calls as well.
     """
-    Returns structured information about movies from a multi-page IMDb movie list.
-    :param start_url: the url of the starting page of a multi-page IMDb movie list
-    :param max_pages: the max number of pages to crawl
-    :return: a list of tuples of info-items about the movies from a multi-page IMDb movie list
+
+    end = time.monotonic() + timeout if timeout is not None else None
+    items = iter(items)
+    futures = deque(executor.submit(function, item) for item in itertools.islice(items, window))
+    try:
+        while futures:
+            yield futures.popleft().result(max(end - time.monotonic(), 0) if end is not None else None)
+            if window is not None:
+                futures.extend(executor.submit(function, item) for item in itertools.islice(items, 1))
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def crawl_concurrent(url: str, max_pages=1, max_workers=8, fetcher=None, timeout=None, paced=False):
+    """Concurrent counterpart of crawl().
+    The pages are fetched in parallel by a bounded pool of max_workers threads,
+    but the BeautifulSoup objects are still yielded in page order (page 1, page 2,...).
+    Parameters: the url of the starting IMDb page, the max number of pages to crawl
+    and the max number of pages fetched at the same time; a Fetcher (optional) is shared by all the threads.
+    Like crawl(), reads the number of pages of the list from the first page and does not fetch the pages beyond it.
+    If timeout (in seconds) is specified and the pages are not all fetched in that time (counted from the start
+    of the concurrent fetching), concurrent.futures.TimeoutError is raised and the pages not yet started are dropped.
+    If paced is True, at most max_workers pages are fetched or waiting to be consumed at any time,
+    and the next page is started only when the consumer asks for the next one (e.g., in a memory-bounded crawl,
+    the consumer pauses the fetching while the RSS is above the ceiling); otherwise, all the pages are started at once.
+    """
+
+    if max_pages < 1:
+        return
+    soup = get_next_soup(url, 1, fetcher)
+    last_page = min(max_pages, get_page_count(soup) or max_pages)
+    yield soup
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # _map_ordered() returns the results in the order of its input, not in the order of completion
+        yield from _map_ordered(executor, lambda page: get_next_soup(url, page, fetcher), range(2, last_page + 1),
+                                timeout, max_workers if paced else None)
+
+
+def get_m_info_from_soup(soup: BeautifulSoup, base_url=BASE_URL):
+    """
+    Returns structured information about movies from a single page of an IMDb movie list.
+    :param soup: the BeautifulSoup object of a page of an IMDb movie list
+    :param base_url: the URL that the movies' (relative) links are resolved against, e.g. the URL of the page
+                     (the crawl functions pass their start URL, so the links point to the site that was crawled)
+    :return: a list of 4-tuples (title, link, year, poster) about the movies from the page
+    Works both for complete pages and for pages parsed with M_INFO_STRAINER.
     Creates and uses the following data:
-    - h3_list - a list of all 'h3' tags from multiple IMDb pages
+    - h3_list - a list of all 'h3' movie headers from the page
+                (the other 'h3' tags, e.g. 'Recently Viewed', are skipped)
                 (each 'h3' tag contains: movie title, year of release, and (relative) link to the movie's IMDb page)
-    - poster_list - a list of all relevant 'div' tags from multiple IMDb pages
+    - poster_list - a list of all relevant 'div' tags from the page
                     (each such a 'div' tag contains the link to the poster of the corresponding movie)
     - info_list - a list of 3-tuples of information about each movie from h3_list
     - poster_link_list - a list of links to the posters of the movies from poster_list
     - complete_list - a list of 4-tuples of information about each movie from h3_list and poster_list
     """
 
-    h3_list = []
-    poster_list = []
-    next_soup = crawl(start_url, max_pages)
-    while True:
-        try:
-            s = next(next_soup)
-            h3_list.extend(s('h3'))
-            h3_list.pop(len(h3_list) - 1)
-            poster_list.extend(s('div', {'class': "lister-item-image ribbonize"}))
-            # pass
-        except StopIteration:
-            break
+    h3_list = soup('h3', {'class': "lister-item-header"})
+    poster_list = soup('div', {'class': "lister-item-image ribbonize"})
     info_list = []
     for h3 in h3_list:
         title = h3.a.text
-        link = BASE_URL + h3.a['href'].lstrip('/')
+        link = urljoin(base_url, h3.a['href'])
         year = h3.a.find_next_sibling().text.lstrip('(').rstrip(')')
         info_t = title, link, year
         info_list.append(info_t)
@@ -100,6 +939,874 @@ def get_m_info(start_url: str, max_pages=1):
     return complete_list
 
 
+class CrawlCheckpoint:
+    """Checkpoint store of a multi-page crawl, kept in the data directory (data/checkpoints),
+    in a file named after the hash of the crawl's start URL.
+    Each completed page is appended to the file as a JSON line {"page": <page>, "records": [<4-tuples>]},
+    so a crash loses at most the page being written, and a restarted crawl needs only the missing pages.
+    The line of the first page also has the number of pages of the list ("page_count", see get_page_count()),
+    so a restarted crawl knows where the list ends even if the first page is not crawled again.
+    """
+
+    def __init__(self, start_url, directory=None):
+        self.start_url = start_url
+        directory = Path(directory) if directory else utility.get_data_dir() / 'checkpoints'
+        directory.mkdir(parents=True, exist_ok=True)
+        self.file = directory / (hashlib.sha256(start_url.encode('utf-8')).hexdigest()[:16] + '.jsonl')
+        self.pages = {}
+        self.page_count = None
+        self._lock = threading.Lock()
+        if self.file.exists():
+            with self.file.open(encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        completed = json.loads(line)
+                    except ValueError:                          # a line cut short by a crash
+                        continue
+                    self.pages[completed['page']] = [tuple(m) for m in completed['records']]
+                    self.page_count = completed.get('page_count', self.page_count)
+
+    def __contains__(self, page):
+        return page in self.pages
+
+    def save(self, page, records, page_count=None):
+        """Records page as completed, with its 4-tuples (title, link, year, poster)
+        and (optionally, for the first page) the number of pages of the list.
+        """
+
+        completed = {'page': page, 'records': records}
+        if page_count is not None:
+            completed['page_count'] = page_count
+        line = json.dumps(completed)
+        with self._lock:
+            with self.file.open('a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self.pages[page] = [tuple(m) for m in records]
+            if page_count is not None:
+                self.page_count = page_count
+
+    def missing_pages(self, max_pages):
+        """Returns the pages up to max_pages that are not completed yet, without the pages beyond the last page
+        of the list (if known) and beyond the first completed page with no movies.
+        """
+
+        last_page = min(max_pages, self.page_count or max_pages)
+        empty = [page for page, records in self.pages.items() if not records]
+        if empty:
+            last_page = min(last_page, min(empty))
+        return [page for page in range(1, last_page + 1) if page not in self.pages]
+
+    def records(self, max_pages):
+        """Returns the 4-tuples of the completed pages up to max_pages, in page order.
+        """
+
+        return [m for page in range(1, max_pages + 1) for m in self.pages.get(page, [])]
+
+    def clear(self):
+        with self._lock:
+            _remove(self.file)
+            self.pages = {}
+            self.page_count = None
+
+
+def normalize_link(link):
+    """Returns the normalized form of a link to a movie's IMDb page, for comparing links:
+    lowercase scheme and host, no query (e.g., '?ref_=kw_li_tt') and fragment, and a trailing slash.
+    """
+
+    url = urlsplit(link.strip())
+    return f'{url.scheme.lower()}://{url.netloc.lower()}{url.path.rstrip("/")}/'
+
+
+class SeenIndex:
+    """Persistent index of the (normalized) links of the movies seen in the earlier crawls,
+    kept in a text file in the data directory (data/seen_links.txt by default), one link per line.
+    The links are loaded into a set, and each new link is appended to the file as soon as it is added.
+    A link should be added only after its movie has been completely processed (e.g., enriched and stored),
+    so that the movies of a failed run are not skipped by the next runs (see filter_new() and add_all()).
+    Can be used as a context manager, which closes the file on exit.
+    """
+
+    def __init__(self, file=None):
+        self.file = Path(file) if file else utility.get_data_dir() / 'seen_links.txt'
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.links = set(self.file.read_text(encoding='utf-8').split()) if self.file.exists() else set()
+        self._f = self.file.open('a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __contains__(self, link):
+        return normalize_link(link) in self.links
+
+    def __len__(self):
+        return len(self.links)
+
+    def add(self, link):
+        """Adds link to the index; returns True if link was not seen before, False otherwise.
+        """
+
+        link = normalize_link(link)
+        with self._lock:
+            if link in self.links:
+                return False
+            self.links.add(link)
+            self._f.write(link + '\n')
+            self._f.flush()
+            return True
+
+    def filter_new(self, m_info):
+        """Returns the 4-tuples (title, link, year, poster) from m_info whose links were not seen before
+        (each link only once); the index is not changed.
+        """
+
+        links = set()
+        new = []
+        for m in m_info:
+            link = normalize_link(m[1])
+            if link not in self.links and link not in links:
+                links.add(link)
+                new.append(m)
+        return new
+
+    def add_all(self, m_info):
+        """Adds the links of the 4-tuples (title, link, year, poster) from m_info to the index.
+        """
+
+        for m in m_info:
+            self.add(m[1])
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ParseCache:
+    """Persistent cache of the results of parse_m_info(), keyed by the SHA-256 hash of the page content,
+    so that a page whose content has not changed since it was last parsed (even if it has been downloaded again)
+    is not parsed again. The results are stored as JSON files in data/parse_cache by default,
+    sharded in subdirectories by the first two hex digits of the hash.
+    The key also includes the parser, the targeted parsing, the base URL of the links and version;
+    version should be changed whenever the extraction (get_m_info_from_soup()) changes,
+    so that the old results are not used.
+    """
+
+    def __init__(self, directory=None, version=1):
+        self.directory = Path(directory) if directory else utility.get_data_dir() / 'parse_cache'
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _file(self, content, parser, targeted, base_url):
+        sha = hashlib.sha256(content)
+        sha.update(f'|{parser}|{targeted}|{base_url}|{self.version}'.encode('utf-8'))
+        key = sha.hexdigest()
+        return self.directory / key[:2] / (key + '.json')
+
+    def parse_m_info(self, response, parser='html.parser', targeted=False, base_url=BASE_URL):
+        """Returns parse_m_info() of the response's text, i.e. the 2-tuple (4-tuples of the page, number of pages),
+        from the cache if the response's content has been parsed before.
+        """
+
+        return self._parse_m_info(response, parser, targeted, base_url)[:2]
+
+    def _parse_m_info(self, response, parser, targeted, base_url):
+        """Returns the 3-tuple (4-tuples of the page, number of pages, whether they came from the cache).
+        """
+
+        cache_file = self._file(response.content, parser, targeted, base_url)
+        try:
+            cached = json.loads(cache_file.read_text(encoding='utf-8'))
+            with self._lock:
+                self.hits += 1
+            return [tuple(m) for m in cached['m_info']], cached['page_count'], True
+        except (OSError, ValueError):
+            pass
+        m_info, page_count = parse_m_info(response.text, parser, targeted, base_url)
+        cache_file.parent.mkdir(exist_ok=True)
+        _write_atomic(cache_file, json.dumps({'m_info': m_info, 'page_count': page_count}).encode('utf-8'))
+        with self._lock:
+            self.misses += 1
+        return m_info, page_count, False
+
+
+class MemoryGuard:
+    """RSS ceiling of a crawl (memory-bounded mode of get_m_info() and iter_m_info()).
+    check() is called after each page is parsed and its tree destroyed, before the next page is fetched:
+    if the RSS of the process (utility.get_rss()) is above max_rss bytes, it runs the garbage collector
+    (BeautifulSoup trees are full of reference cycles, so they are not always freed as soon as they are dropped)
+    and then pauses the fetching, for up to max_wait seconds, until the RSS falls below max_rss
+    (e.g., until the other threads of a concurrent crawl complete their pages); if it does not, MemoryError is raised.
+    The peak RSS seen during the crawl is in the peak field (see also summary()).
+    Where the current RSS is not available (utility.get_rss() returns None, e.g. on Windows without psutil),
+    the ceiling is not enforced and the peak is unknown (None).
+    """
+
+    def __init__(self, max_rss=None, max_wait=10.0, pause=0.1):
+        self.max_rss = max_rss
+        self.max_wait = max_wait
+        self.pause = pause
+        self.peak = utility.get_rss()
+        self.pauses = 0
+        self.paused = 0.0
+        self._lock = threading.Lock()
+
+    def _sample(self):
+        rss = utility.get_rss()
+        if rss is not None:
+            with self._lock:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+        return rss
+
+    def _above(self, rss):
+        return rss is not None and self.max_rss is not None and rss > self.max_rss
+
+    def check(self):
+        if not self._above(self._sample()):
+            return
+        gc.collect()
+        start = time.monotonic()
+        while True:
+            rss = self._sample()
+            if not self._above(rss):
+                break
+            if time.monotonic() - start >= self.max_wait:
+                raise MemoryError(f'RSS {rss} bytes stays above the ceiling of {self.max_rss} bytes')
+            time.sleep(self.pause)
+            gc.collect()
+        with self._lock:
+            self.pauses += 1
+            self.paused += time.monotonic() - start
+
+    def summary(self):
+        """Returns the peak RSS (in MB, None if unknown), the number of pauses and the total time paused (in seconds)
+        as a dict.
+        """
+
+        return {'peak_rss_mb': round(self.peak / 2 ** 20, 1) if self.peak is not None else None,
+                'pauses': self.pauses, 'paused': round(self.paused, 3)}
+
+
+def get_m_info(start_url: str, max_pages=1, max_workers=None, fetcher=None, checkpoint=None, seen=None,
+               deadline=None, parse_cache=None, memory_guard=None):
+    """
+    Returns structured information about movies from a multi-page IMDb movie list.
+    :param start_url: the url of the starting page of a multi-page IMDb movie list
+    :param max_pages: the max number of pages to crawl
+    :param max_workers: if specified, the pages are fetched concurrently (crawl_concurrent()) by max_workers threads;
+                        otherwise, they are fetched one after another (crawl())
+    :param fetcher: the Fetcher to get the pages with (optional)
+    :param checkpoint: the CrawlCheckpoint of the crawl (optional); if specified, only the pages missing from it
+                       are crawled, and each crawled page is saved to it as soon as it is completed
+    :param seen: the SeenIndex of the earlier crawls (optional); if specified, only the movies not seen before
+                 are returned; they are not added to the index, which is up to the caller once they are processed
+                 (e.g., by seen.add_all(), or by enrich_m_info() with the same index)
+    :param deadline: the max duration of the whole call, in seconds (optional); when it is exceeded,
+                     TimeoutError is raised (a page already being fetched can still take up to the request timeout,
+                     DEFAULT_TIMEOUT or the Fetcher's timeout, but no new page is started)
+    :param parse_cache: the ParseCache to get the results of the pages parsed before from (optional)
+    :param memory_guard: the MemoryGuard of the crawl (optional); if specified, the crawl is memory-bounded:
+                         the tree of each page is destroyed as soon as its 4-tuples are extracted,
+                         and the fetching pauses whenever the RSS is above the guard's ceiling
+                         (with max_workers, no new page is started while it pauses, see crawl_concurrent())
+    :return: a list of 4-tuples (title, link, year, poster) about the movies from a multi-page IMDb movie list,
+             as collected by get_m_info_from_soup() from each page
+    """
+
+    end = time.monotonic() + deadline if deadline is not None else None
+    telemetry = fetcher.telemetry if fetcher is not None else None
+    since = telemetry.snapshot() if telemetry is not None else None
+
+    def time_left():
+        if end is None:
+            return None
+        left = end - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f'get_m_info() exceeded its deadline of {deadline}s')
+        return left
+
+    def extract(soup, page):
+        start = time.perf_counter()
+        m_info = get_m_info_from_soup(soup, start_url)
+        if telemetry is not None:
+            telemetry.emit('extract', page=page, items=len(m_info), extract=time.perf_counter() - start)
+        if memory_guard is not None:
+            soup.decompose()                                    # the 4-tuples hold plain strings only
+            memory_guard.check()
+        return m_info
+
+    def crawl_page(page):
+        """Returns the 4-tuples of page and the number of pages of the list, and saves the page to the checkpoint.
+        """
+
+        if parse_cache is None:
+            soup = get_next_soup(start_url, page, fetcher)
+            page_count = get_page_count(soup)
+            m_info = extract(soup, page)
+        else:
+            parser, parse_only = _parse_options(fetcher, None, None)
+            response = get_response(get_specific_page(start_url, page), fetcher)
+            start = time.perf_counter()
+            m_info, page_count, hit = parse_cache._parse_m_info(response, parser, parse_only is not None, start_url)
+            if telemetry is not None:
+                telemetry.emit('extract', page=page, items=len(m_info), extract=time.perf_counter() - start,
+                               parse_cached=int(hit))
+            if memory_guard is not None:
+                memory_guard.check()
+        if checkpoint is not None:
+            checkpoint.save(page, m_info, page_count if page == 1 else None)
+        return m_info, page_count
+
+    try:
+        if checkpoint is not None or parse_cache is not None:
+            # Crawl page by page: only the pages missing from the checkpoint (if any), up to the last page
+            # of the list (known from the first page, either crawled now or saved in the checkpoint)
+            # or the first page with no movies
+            pages = checkpoint.missing_pages(max_pages) if checkpoint is not None else list(range(1, max_pages + 1))
+            m_info = {}
+            if pages and pages[0] == 1:
+                m_info[1], page_count = crawl_page(1)
+                pages = [page for page in pages[1:] if page <= (page_count or max_pages)] if m_info[1] else []
+            if not max_workers:
+                for page in pages:
+                    time_left()
+                    m_info[page] = crawl_page(page)[0]
+                    if not m_info[page]:
+                        break
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = _map_ordered(executor, crawl_page, pages, time_left())
+                    try:
+                        for page, (page_m_info, _) in zip(pages, results):
+                            m_info[page] = page_m_info
+                            if not page_m_info:
+                                break
+                    finally:
+                        results.close()                         # the pages not yet started are cancelled
+            complete_list = checkpoint.records(max_pages) if checkpoint is not None \
+                else [m for page in sorted(m_info) for m in m_info[page]]
+        else:
+            complete_list = []
+            next_soup = crawl(start_url, max_pages, fetcher) if not max_workers \
+                else crawl_concurrent(start_url, max_pages, max_workers, fetcher, time_left(),
+                                      paced=memory_guard is not None)
+            page = 0
+            while True:
+                try:
+                    s = next(next_soup)
+                    page += 1
+                    complete_list.extend(extract(s, page))
+                    del s
+                    time_left()
+                except StopIteration:
+                    break
+    except FuturesTimeoutError:                                 # not the same as TimeoutError before Python 3.11
+        raise TimeoutError(f'get_m_info() exceeded its deadline of {deadline}s')
+    if telemetry is not None:
+        summary = telemetry.summary(since)
+        if memory_guard is not None:
+            summary.update(memory_guard.summary())
+        telemetry.emit('summary', start_url=start_url, **summary)
+    return complete_list if seen is None else seen.filter_new(complete_list)
+
+
+def iter_m_info(start_url: str, max_pages=1, fetcher=None, seen=None, memory_guard=None):
+    """Streaming, constant-memory counterpart of get_m_info(), implemented as a Python generator.
+    Yields the 4-tuples (title, link, year, poster) of each page as soon as the page is parsed,
+    and then destroys the page's tree (<soup>.decompose()), so that at most one page is in memory at any time,
+    regardless of max_pages. The tuples contain plain strings only, i.e. no references to the tree.
+    If a SeenIndex is passed as seen, only the movies not seen before are yielded (and not added to the index).
+    If a MemoryGuard is passed as memory_guard, the next page is not fetched while the RSS is above its ceiling.
+    """
+
+    for soup in crawl(start_url, max_pages, fetcher):
+        m_info = get_m_info_from_soup(soup, start_url)
+        soup.decompose()
+        del soup
+        if memory_guard is not None:
+            memory_guard.check()
+        yield from m_info if seen is None else seen.filter_new(m_info)
+
+
+def parse_m_info(html, parser='html.parser', targeted=False, base_url=BASE_URL):
+    """Returns the 4-tuples (title, link, year, poster) from the HTML text of a page of an IMDb movie list,
+    and the number of pages of the list (see get_page_count()), as a 2-tuple.
+    A module-level function, so that it can be run in a worker process (see get_m_info_multiprocess()).
+    """
+
+    soup = BeautifulSoup(html, parser, parse_only=M_INFO_STRAINER if targeted else None)
+    return get_m_info_from_soup(soup, base_url), get_page_count(soup)
+
+
+def get_m_info_multiprocess(start_url: str, max_pages=1, max_workers=8, processes=None, fetcher=None):
+    """Multi-core counterpart of get_m_info().
+    The pages are fetched by a pool of max_workers I/O threads, and each page's HTML text is handed over
+    to a pool of worker processes (ProcessPoolExecutor, processes workers, default: the number of CPU cores)
+    for parsing and extraction (parse_m_info()), so that parsing is not limited to one core by the GIL.
+    Only the HTML text goes to the worker processes, and only the compact 4-tuples come back.
+    The parser and the targeted parsing of the Fetcher (if passed) are used in the worker processes.
+    The worker processes are started with the 'spawn' method: they are started on demand, from the fetching threads,
+    and forking a process while other threads may hold locks (requests, logging,...) can deadlock it.
+    """
+
+    parser = fetcher.parser if fetcher is not None else 'html.parser'
+    targeted = fetcher.targeted if fetcher is not None else False
+    context = multiprocessing.get_context('spawn')
+    with ThreadPoolExecutor(max_workers=max_workers) as threads, \
+            ProcessPoolExecutor(processes, mp_context=context) as process_pool:
+        def fetch_and_parse(page):
+            html = get_response(get_specific_page(start_url, page), fetcher).text
+            return process_pool.submit(parse_m_info, html, parser, targeted, start_url)
+
+        complete_list, page_count = fetch_and_parse(1).result()
+        last_page = min(max_pages, page_count or max_pages)
+        # threads.map() returns the futures of the worker processes in page order
+        for parsed in threads.map(fetch_and_parse, range(2, last_page + 1)):
+            complete_list.extend(parsed.result()[0])
+    return complete_list
+
+
+def iter_frontier_m_info(start_urls, max_pages=1, max_workers=8, fetcher=None, errors=None):
+    """Crawls many multi-page IMDb movie lists under one global concurrency budget, implemented as a Python generator
+    that yields (start_url, (title, link, year, poster)) 2-tuples, i.e. the 4-tuples tagged with their source list,
+    in the order in which the pages are completed.
+    The crawl frontier keeps the lists in a round-robin queue: each free worker (at most max_workers pages in flight)
+    takes the next page (get_specific_page()) of the next list in the queue, so a huge list cannot starve the others.
+    The first page of each list tells its number of pages (up to max_pages); a page with no movies ends its list.
+    The pages are parsed with parse_m_info() (with the parsing options of the Fetcher, if passed).
+    A page that cannot be fetched (requests.RequestException, including the error pages, after the Fetcher's retries)
+    ends its list only, and the other lists are crawled on; if a dictionary is passed as errors,
+    the error of each such a list is added to it as {start_url: (page, exception)}.
+    """
+
+    parser = fetcher.parser if fetcher is not None else 'html.parser'
+    targeted = fetcher.targeted if fetcher is not None else False
+
+    def fetch_page(start_url, page):
+        response = get_response(get_specific_page(start_url, page), fetcher)
+        response.raise_for_status()
+        return parse_m_info(response.text, parser, targeted, start_url)
+
+    next_page = {start_url: 1 for start_url in start_urls}
+    last_page = {start_url: max_pages for start_url in next_page}
+    frontier = deque(start_url for start_url in next_page if max_pages >= 1)
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while frontier or in_flight:
+            while frontier and len(in_flight) < max_workers:
+                start_url = frontier.popleft()
+                page = next_page[start_url]
+                next_page[start_url] += 1
+                in_flight[executor.submit(fetch_page, start_url, page)] = start_url, page
+                # The first page is back in the queue only when it is done (and the list's last page is known)
+                if page > 1 and next_page[start_url] <= last_page[start_url]:
+                    frontier.append(start_url)
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                start_url, page = in_flight.pop(future)
+                try:
+                    m_info, page_count = future.result()
+                except requests.RequestException as e:
+                    if errors is not None:
+                        errors[start_url] = page, e
+                    m_info, page_count = [], None
+                if page == 1:
+                    last_page[start_url] = min(max_pages, page_count or max_pages)
+                    if m_info and next_page[start_url] <= last_page[start_url]:
+                        frontier.append(start_url)
+                elif not m_info:
+                    last_page[start_url] = page                 # no more pages are queued for this list
+                    if start_url in frontier:
+                        frontier.remove(start_url)
+                for m in m_info:
+                    yield start_url, m
+
+
+def get_movie_details(soup: BeautifulSoup):
+    """Returns the rating (float), the runtime (in minutes) and the genres (list) of a movie, as a 3-tuple,
+    from the BeautifulSoup object of the movie's IMDb page, where they are in a JSON-LD script
+    (<script type="application/ld+json">); the missing details are None.
+    """
+
+    script = soup.find('script', {'type': 'application/ld+json'})
+    try:
+        details = json.loads(script.string) if script else {}
+    except ValueError:
+        details = {}
+    rating = details.get('aggregateRating', {}).get('ratingValue')
+    rating = float(rating) if rating is not None else None
+    duration = re.fullmatch(r'PT(?:(\d+)H)?(?:(\d+)M)?', details.get('duration', ''))
+    runtime = int(duration.group(1) or 0) * 60 + int(duration.group(2) or 0) if duration else None
+    genres = details.get('genre')
+    genres = [genres] if isinstance(genres, str) else genres
+    return rating, runtime, genres
+
+
+def enrich_movie(m, fetcher=None, seen=None):
+    """Returns the 7-tuple (title, link, year, poster, rating, runtime, genres) of the movie m,
+    a 4-tuple (title, link, year, poster), with the details from the movie's IMDb page (get_movie_details());
+    the details are None if the page could not be fetched (a network error or a status other than 200).
+    If a SeenIndex is passed as seen, the movie's link is added to it only once the details are got.
+    """
+
+    try:
+        response = get_response(m[1], fetcher)
+        if response.status_code != 200:
+            raise requests.HTTPError(f'{response.status_code} for url: {m[1]}', response=response)
+    except requests.RequestException:
+        return m + (None, None, None)
+    details = get_movie_details(_make_soup(m[1], response, fetcher, parse_only=SoupStrainer('script')))
+    if seen is not None:
+        seen.add(m[1])
+    return m + details
+
+
+def enrich_m_info(m_info, max_workers=8, fetcher=None, seen=None):
+    """Follows the links of the movies from m_info (4-tuples (title, link, year, poster), e.g. from get_m_info())
+    to the movies' IMDb pages concurrently, by a bounded pool of max_workers threads,
+    and returns the list of 7-tuples (title, link, year, poster, rating, runtime, genres), in the order of m_info
+    (see get_movie_details(); the details of the pages that could not be fetched are None).
+    Passing a Fetcher reuses its connection pool, cache, rate limiter,...
+    If a SeenIndex of the already enriched movies is passed as seen, those movies are skipped
+    (not returned), and the newly enriched ones are added to it.
+    """
+
+    if seen is not None:
+        m_info = [m for m in m_info if m[1] not in seen]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda m: enrich_movie(m, fetcher, seen), m_info))
+
+
+def run_crawl_pipeline(start_url: str, max_pages=1, fetcher=None, file=None, fetch_workers=4, extract_workers=1,
+                       enrich_workers=8, queue_size=None, report=None, report_interval=1.0, cancel_event=None):
+    """Crawls a multi-page IMDb movie list with a staged Pipeline (see util/pipeline.py), i.e. with the stages
+    - 'fetch' (fetch_workers threads): the number of a page -> the page's BeautifulSoup object (get_next_soup())
+    - 'extract' (extract_workers threads): the BeautifulSoup object -> the page's 4-tuples (get_m_info_from_soup()),
+      passed on one by one; the tree is destroyed right away
+    - 'enrich' (enrich_workers threads): a 4-tuple -> the 7-tuple (title, link, year, poster, rating, runtime, genres)
+      (enrich_movie())
+    - 'persist' (1 thread): the 7-tuple is appended to file (data/movies.jsonl by default) as a JSON line
+    connected by queues of at most queue_size items each (default: twice the number of workers of the next stage).
+    report is called with the per-stage statistics (Pipeline.stats()) every report_interval seconds, and at the end.
+    Setting cancel_event (a threading.Event, e.g. from another thread or from report) cancels the crawl;
+    the 7-tuples persisted so far are returned.
+    Like crawl(), the first page is fetched before the others (by the pipeline's feeder thread), to read
+    the number of pages of the list from it, and the pages beyond it are not fetched.
+    Returns the 7-tuples in the order of completion.
+    """
+
+    file = Path(file) if file else utility.get_data_dir() / 'movies.jsonl'
+    file.parent.mkdir(parents=True, exist_ok=True)
+
+    first = {}
+
+    def pages():
+        first[1] = get_next_soup(start_url, 1, fetcher)
+        yield from range(1, min(max_pages, get_page_count(first[1]) or max_pages) + 1)
+
+    def fetch(page):
+        return first.pop(page) if page in first else get_next_soup(start_url, page, fetcher)
+
+    def extract(soup):
+        m_info = get_m_info_from_soup(soup, start_url)
+        soup.decompose()
+        return m_info
+
+    with file.open('a', encoding='utf-8') as f:
+
+        def persist(m):
+            f.write(json.dumps(m) + '\n')
+            return m
+
+        pipeline = Pipeline(Stage('fetch', fetch, fetch_workers, queue_size),
+                            Stage('extract', extract, extract_workers, queue_size, fan_out=True),
+                            Stage('enrich', lambda m: enrich_movie(m, fetcher), enrich_workers, queue_size),
+                            Stage('persist', persist, 1, queue_size),
+                            report=report, report_interval=report_interval, cancel_event=cancel_event)
+        return pipeline.run(pages())
+
+
+def enqueue_m_info_pages(queue, start_url, max_pages=1):
+    """Adds the URLs of the pages of a multi-page IMDb movie list (get_specific_page()) to a WorkQueue.
+    All max_pages pages are added, since the number of pages of the list is not known yet;
+    the worker that completes the first page cancels the pages beyond the last one (see run_m_info_worker()).
+    """
+
+    queue.put(get_specific_page(start_url, page) for page in range(1, max_pages + 1))
+
+
+def _split_page(url):
+    """Returns the 2-tuple (start URL, page) of the URL of a page of a list, as made by get_specific_page();
+    page is None if url is not such a URL.
+    """
+
+    start_url, _, page = url.rpartition('&page=')
+    return (start_url, int(page)) if start_url and page.isdigit() else (url, None)
+
+
+def run_m_info_worker(queue, fetcher=None, owner=None, batch=1, poll=1.0):
+    """Runs a crawl worker on a WorkQueue of page URLs (see enqueue_m_info_pages()), until the queue is finished.
+    The worker leases batch pages at a time, gets the 4-tuples (title, link, year, poster) of each page
+    as in get_m_info() (parse_m_info(), with the parsing options of the Fetcher, if passed) and completes the page
+    with them; a page that cannot be fetched (including an error page, i.e. a status other than 200)
+    is released back to the queue, and so is the page being processed if any other exception is raised
+    (and re-raised), so that it does not stay leased until its lease expires.
+    Like the other crawl functions, the workers stop at the last page of the list: when the first page is completed,
+    the pending pages of the same list beyond the number of pages read from it are cancelled (WorkQueue.cancel()),
+    and so are the pending pages beyond any completed page with no movies
+    (the pages already leased by then, e.g. with a large batch, are still fetched).
+    When there is nothing to lease but other workers still hold leases, the worker polls the queue
+    every poll seconds, to take over the pages of crashed workers.
+    Any number of workers (threads, processes, hosts) can run on the same queue; returns the number of pages
+    completed by this worker. The results of all the workers are in queue.results().
+    """
+
+    owner = owner or default_owner()
+    parser, parse_only = _parse_options(fetcher, None, None)
+    completed = 0
+    while True:
+        urls = queue.lease(owner, batch)
+        if not urls:
+            if queue.is_finished():
+                return completed
+            time.sleep(poll)
+            continue
+        for url in urls:
+            try:
+                response = get_response(url, fetcher)
+                if response.status_code != 200:
+                    raise requests.HTTPError(f'{response.status_code} for url: {url}', response=response)
+                m_info, page_count = parse_m_info(response.text, parser, parse_only is not None, url)
+            except requests.RequestException:
+                queue.release(url, owner)
+                continue
+            except BaseException:
+                queue.release(url, owner)
+                raise
+            completed += queue.complete(url, m_info, owner)
+            start_url, page = _split_page(url)
+            last_page = page if not m_info else page_count if page == 1 else None
+            if page is not None and last_page:
+                queue.cancel(item for item in queue.pending()
+                             if _split_page(item)[0] == start_url and (_split_page(item)[1] or 0) > last_page)
+
+
+class MInfoParser(HTMLParser):
+    """Incremental extractor of movie info from IMDb movie lists, based on the html.parser tokenizer.
+    Instead of building a tree, it can be fed the page text chunk by chunk (<parser>.feed(<chunk>)),
+    and collects the same 4-tuples (title, link, year, poster) as get_m_info_from_soup()
+    as soon as the header ('h3') of each movie is closed; pop_records() returns (and forgets) the collected tuples.
+    The number of pages of the list (see get_page_count()) is in page_count once the list's description is read.
+    The movies' links are resolved against base_url (see get_m_info_from_soup()).
+    """
+
+    def __init__(self, base_url=BASE_URL):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.records = []
+        self.page_count = None
+        self._desc = None                                       # the text of the 'desc' div while reading it
+        self._in_poster = False
+        self._poster = None
+        self._in_header = False
+        self._field = None                                      # 'title' or 'year' while reading their text
+        self._title, self._link, self._year = [], None, None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        css_class = attrs.get('class')
+        if tag == 'div' and css_class == 'desc':
+            self._desc = []
+        elif tag == 'div' and css_class == 'lister-item-image ribbonize':
+            self._in_poster = True
+        elif tag == 'img' and self._in_poster:
+            self._poster = attrs.get('loadlate')
+            self._in_poster = False
+        elif tag == 'h3' and css_class == 'lister-item-header':
+            self._in_header = True
+            self._title, self._link, self._year = [], None, None
+        elif self._in_header and tag == 'a' and self._link is None:
+            self._link = attrs.get('href', '')
+            self._field = 'title'
+        elif self._in_header and self._link is not None and self._year is None:
+            # Just like h3.a.find_next_sibling() in get_m_info_from_soup(): the first tag after the link
+            self._year = []
+            self._field = 'year'
+
+    def handle_data(self, data):
+        if self._desc is not None:
+            self._desc.append(data)
+        elif self._field == 'title':
+            self._title.append(data)
+        elif self._field == 'year':
+            self._year.append(data)
+
+    def handle_endtag(self, tag):
+        if self._desc is not None and tag == 'div':
+            self.page_count = _parse_page_count(''.join(self._desc))
+            self._desc = None
+        elif self._in_header and tag in ('a', 'span'):
+            self._field = None
+        elif self._in_header and tag == 'h3':
+            self._in_header = False
+            self._field = None
+            year = ''.join(self._year or []).lstrip('(').rstrip(')')
+            self.records.append((''.join(self._title), urljoin(self.base_url, self._link), year, self._poster))
+            self._poster = None
+
+    def pop_records(self):
+        records, self.records = self.records, []
+        return records
+
+
+def iter_m_info_streamed(start_url: str, max_pages=1, fetcher=None, chunk_size=16 * 1024):
+    """Streaming counterpart of iter_m_info(), implemented as a Python generator.
+    Each page is downloaded as a stream (stream=True) and its chunks are fed to a MInfoParser as they arrive,
+    so the 4-tuples (title, link, year, poster) are yielded while the rest of the page is still being downloaded,
+    and neither the complete page text nor its tree is ever in memory.
+    A Fetcher's session is used if it is passed, but its cache is not (a cached response is not a stream).
+    Like crawl(), stops at the last page of the list (read from the first page) and after a page with no movies.
+    """
+
+    last_page = max_pages
+    page = 1
+    while page <= last_page:
+        url = get_specific_page(start_url, page)
+        response = requests.get(url, allow_redirects=False, stream=True, timeout=DEFAULT_TIMEOUT) if fetcher is None \
+            else fetcher.stream(url)
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        parser = MInfoParser(start_url)
+        n = 0
+        with response:
+            for chunk in response.iter_content(chunk_size, decode_unicode=True):
+                parser.feed(chunk)
+                records = parser.pop_records()
+                n += len(records)
+                yield from records
+        parser.close()
+        records = parser.pop_records()
+        n += len(records)
+        yield from records
+        if page == 1:
+            last_page = min(max_pages, parser.page_count or max_pages)
+        if not n:
+            break
+        page += 1
+
+
+def download_posters(poster_urls, directory=None, max_workers=8, fetcher=None, chunk_size=64 * 1024):
+    """Downloads the posters from poster_urls (e.g., the poster links from get_m_info()) concurrently,
+    by a bounded pool of max_workers threads, and returns a dictionary {poster URL: Path of the poster file}
+    (None for the posters that could not be downloaded).
+    The posters are stored by the SHA-256 hash of their content, in data/posters by default,
+    sharded in subdirectories by the first two pairs of hex digits of the hash (e.g., 3f/a2/3fa2...c1.jpg),
+    so the same image reached through different URLs is stored only once.
+    Each poster is streamed to a temporary file in chunks of chunk_size bytes, and hashed while it is written.
+    Redirects (e.g., from image CDNs) are followed, and only the responses with status 200 are stored.
+    The URLs already downloaded (recorded in index.json in the posters directory) are skipped.
+    """
+
+    directory = Path(directory) if directory else utility.get_data_dir() / 'posters'
+    directory.mkdir(parents=True, exist_ok=True)
+    index_file = directory / 'index.json'
+    index = json.loads(index_file.read_text(encoding='utf-8')) if index_file.exists() else {}
+
+    def download(url):
+        response = requests.get(url, stream=True, timeout=DEFAULT_TIMEOUT) if fetcher is None \
+            else fetcher.stream(url, allow_redirects=True)
+        with response:
+            response.raise_for_status()
+            if response.status_code != 200:
+                raise requests.HTTPError(f'{response.status_code} for url: {url}', response=response)
+            sha = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as f:
+                try:
+                    for chunk in response.iter_content(chunk_size):
+                        sha.update(chunk)
+                        f.write(chunk)
+                except BaseException:
+                    f.close()
+                    os.remove(f.name)
+                    raise
+        digest = sha.hexdigest()
+        poster_file = directory / digest[:2] / digest[2:4] / (digest + (Path(urlsplit(url).path).suffix or '.jpg'))
+        try:
+            if poster_file.exists():
+                os.remove(f.name)
+            else:
+                poster_file.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(f.name, poster_file)
+        except OSError:
+            _remove(f.name)
+            raise
+        return poster_file
+
+    posters = {url: directory / index[url] for url in poster_urls if url in index and (directory / index[url]).exists()}
+    missing = [url for url in dict.fromkeys(poster_urls) if url not in posters]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(download, url): url for url in missing}
+        for future in as_completed(futures):
+            try:
+                posters[futures[future]] = future.result()
+            except (requests.RequestException, OSError):
+                posters[futures[future]] = None
+
+    index.update({url: path.relative_to(directory).as_posix() for url, path in posters.items() if path is not None})
+    _write_atomic(index_file, json.dumps(index, indent=4).encode('utf-8'))
+    return posters
+
+
+async def crawl_async(url: str, max_pages=1, limit=8, fetcher=None):
+    """Asynchronous counterpart of crawl(), implemented as an async generator.
+    Yields (page, BeautifulSoup object) pairs in the order in which the pages are completed, not in page order.
+    Like crawl(), fetches the first page before the others, to read the number of pages of the list from it
+    (get_page_count()), and does not fetch the pages beyond it.
+    The blocking HTTP requests run in the event loop's default executor, so they do not block the event loop,
+    and an asyncio.Semaphore makes sure that at most limit pages are being fetched at the same time.
+    Parameters: the url of the starting IMDb page, the max number of pages to crawl,
+    the max number of pages fetched at the same time and (optionally) the Fetcher to get the pages with.
+    """
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(limit)
+
+    async def fetch_page(page):
+        async with semaphore:
+            return page, await loop.run_in_executor(None, get_next_soup, url, page, fetcher)
+
+    if max_pages < 1:
+        return
+    first = await fetch_page(1)
+    last_page = min(max_pages, get_page_count(first[1]) or max_pages)
+    tasks = [asyncio.ensure_future(fetch_page(page)) for page in range(2, last_page + 1)]
+    try:
+        yield first
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # If the consumer stops early, do not leave the remaining pages running
+        for task in tasks:
+            task.cancel()
+
+
+async def get_m_info_async(start_url: str, max_pages=1, limit=8, fetcher=None):
+    """Asynchronous counterpart of get_m_info().
+    Collects the pages from crawl_async() as they complete, but returns the 4-tuples (title, link, year, poster)
+    in page order, just like get_m_info().
+    """
+
+    m_info = {}
+    async for page, soup in crawl_async(start_url, max_pages, limit, fetcher):
+        m_info[page] = get_m_info_from_soup(soup, start_url)
+    return [m for page in sorted(m_info) for m in m_info[page]]
+
+
 if __name__ == "__main__":
 
     # Test get_soup()
@@ -109,9 +1816,12 @@ if __name__ == "__main__":
     print(soup)
     print()
 
-    # Write BeautifulSoup info to an HTML file (using write_text(str(<soup>), encoding='utf-8', errors='replace')
-    f = utility.get_data_dir() / 'IMDb_soup_rnr.html'
-    f.write_text(str(soup), encoding='utf-8', errors='replace')
+    # Record the responses of a crawl to an archive in the data directory, and replay the crawl offline from it
+    archive = CrawlArchive(utility.get_data_dir() / 'IMDb_rnr.archive')
+    with Fetcher(recorder=archive) as fetcher:
+        print(len(get_m_info(start_url, 2, fetcher=fetcher)))
+    with ReplayFetcher(archive) as fetcher:
+        print(len(get_m_info(start_url, 2, fetcher=fetcher)), len(archive))
     print()
 
     # Demonstrate <soup>.find_all('<tag_name>') for 'h3' - attribute h3.text
@@ -184,4 +1894,164 @@ if __name__ == "__main__":
         print(m)
     print()
 
+    # Test get_page_count() and crawl() with prefetching (the crawl stops at the last page of the list)
+    print(get_page_count(soup))
+    for s in crawl(start_url, 1000, prefetch=2):
+        print(len(get_m_info_from_soup(s)))
+    print()
+
+    # Test crawl_concurrent() and get_m_info() with concurrent fetching
+    for s in crawl_concurrent(start_url, 3, max_workers=3):
+        print(s('h3'))
+    print()
+    for m in get_m_info(start_url, 3, max_workers=3):
+        print(m)
+    print()
+
+    # Test CrawlCheckpoint (a restarted crawl resumes at the first missing page)
+    checkpoint = CrawlCheckpoint(start_url)
+    print(len(get_m_info(start_url, 2, checkpoint=checkpoint)), checkpoint.missing_pages(3))
+    print(len(get_m_info(start_url, 3, checkpoint=checkpoint)), checkpoint.missing_pages(3))
+    checkpoint.clear()
+    print()
+
+    # Test Fetcher with a RateLimiter and retries
+    with Fetcher(rate_limiter=RateLimiter(rate=2, burst=2), retries=3) as fetcher:
+        t = time.perf_counter()
+        print(len(get_m_info(start_url, 3, max_workers=3, fetcher=fetcher)), f'{time.perf_counter() - t:.3f}s')
+        print(fetcher.rate_limiter.rate(start_url))
+    print()
+
+    # Test SeenIndex (the second crawl returns only the movies not seen in the first one)
+    with SeenIndex(utility.get_data_dir() / 'seen_links_demo.txt') as seen:
+        m_info = get_m_info(start_url, 1, seen=seen)
+        seen.add_all(m_info)                                    # once the movies are processed (e.g., stored)
+        print(len(m_info), len(get_m_info(start_url, 2, seen=seen)), len(seen))
+    (utility.get_data_dir() / 'seen_links_demo.txt').unlink()
+    print()
+
+    # Test iter_m_info()
+    for m in iter_m_info(start_url, 2):
+        print(m)
+    print()
+
+    # Test the parser backends and targeted parsing
+    for parser in ['html.parser', FAST_PARSER]:
+        for targeted in [False, True]:
+            with Fetcher(parser=parser, targeted=targeted) as fetcher:
+                t = time.perf_counter()
+                m_info = get_m_info(start_url, 2, fetcher=fetcher)
+                print(parser, targeted, len(m_info), f'{time.perf_counter() - t:.3f}s')
+    print()
+
+    # Test iter_m_info_streamed()
+    for m in iter_m_info_streamed(start_url, 2, chunk_size=4096):
+        print(m)
+    print()
+
+    # Test the deadline of get_m_info() and hedged requests
+    try:
+        print(len(get_m_info(start_url, 3, deadline=0.5)))
+    except TimeoutError as e:
+        print(e)
+    with Fetcher(timeout=(3.05, 10), hedge_percentile=90, hedge_min_samples=2) as fetcher:
+        print(len(get_m_info(start_url, 5, max_workers=2, fetcher=fetcher)), fetcher.hedged)
+    print()
+
+    # Test get_soup_coalesced() (the concurrent callers share one request and one BeautifulSoup object)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        soups = list(executor.map(lambda _: get_soup_coalesced(start_url), range(4)))
+    print(len({id(s) for s in soups}))
+
+    async def get_soups():
+        return await asyncio.gather(*[get_soup_coalesced_async(start_url) for _ in range(4)])
+
+    print(len({id(s) for s in asyncio.run(get_soups())}))
+    print()
+
+    # Test iter_frontier_m_info() (several keyword lists crawled together, with fair scheduling)
+    start_urls = [start_url, start_url.replace('rock-music', 'punk-rock'), start_url.replace('rock-music', 'blues')]
+    for source, m in iter_frontier_m_info(start_urls, 2, max_workers=4):
+        print(source[-60:], m)
+    print()
+
+    # Test enrich_m_info()
+    with Fetcher(pool_size=8) as fetcher:
+        for m in enrich_m_info(get_m_info(start_url, 1, fetcher=fetcher)[:10], max_workers=8, fetcher=fetcher):
+            print(m)
+    print()
+
+    # Test CrawlTelemetry (print the events of each page and the summary of the crawl)
+    with Fetcher(telemetry=CrawlTelemetry(print)) as fetcher:
+        get_m_info(start_url, 2, fetcher=fetcher)
+    print()
+
+    # Test ParseCache (the second crawl gets the results of the unchanged pages from the cache)
+    parse_cache = ParseCache()
+    for _ in range(2):
+        print(len(get_m_info(start_url, 2, parse_cache=parse_cache)), parse_cache.hits, parse_cache.misses)
+    print()
+
+    # Test run_m_info_worker() (two workers on a shared WorkQueue; run more processes on the same file to scale out)
+    queue = WorkQueue(utility.get_data_dir() / 'crawl_queue_demo.sqlite', visibility_timeout=60)
+    enqueue_m_info_pages(queue, start_url, 3)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        print(list(executor.map(lambda worker: run_m_info_worker(queue, owner=f'worker{worker}'), range(2))))
+    print(sum(len(m_info) for m_info in queue.results().values()), queue.counts())
+    queue.close()
+    (utility.get_data_dir() / 'crawl_queue_demo.sqlite').unlink()
+    print()
+
+    # Test run_crawl_pipeline() (print the throughput and the queue depths of the stages while it runs)
+    with Fetcher(pool_size=12) as fetcher:
+        movies = run_crawl_pipeline(start_url, 2, fetcher, utility.get_data_dir() / 'movies_demo.jsonl',
+                                    report=lambda stats: print({name: (s['throughput'], s['queue_depth'])
+                                                                for name, s in stats.items()}))
+    print(len(movies), movies[0])
+    (utility.get_data_dir() / 'movies_demo.jsonl').unlink()
+    print()
+
+    # Test MemoryGuard (memory-bounded crawls: each tree destroyed right away, and the peak RSS of each crawl)
+    rss = utility.get_rss()
+    max_rss = rss + 200 * 2 ** 20 if rss is not None else None
+    memory_guard = MemoryGuard(max_rss=max_rss)
+    print(len(get_m_info(start_url, 3, memory_guard=memory_guard)), memory_guard.summary())
+    memory_guard = MemoryGuard(max_rss=max_rss)
+    print(sum(1 for _ in iter_m_info(start_url, 3, memory_guard=memory_guard)), memory_guard.summary())
+    print()
+
+    # Test get_m_info_multiprocess()
+    print(len(get_m_info_multiprocess(start_url, 3, max_workers=3, processes=2)))
+    print()
+
+    # Test download_posters() (the second call finds all the posters in data/posters)
+    poster_urls = [m[3] for m in get_m_info(start_url, 1)]
+    with Fetcher(pool_size=8) as fetcher:
+        for _ in range(2):
+            t = time.perf_counter()
+            posters = download_posters(poster_urls, max_workers=8, fetcher=fetcher)
+            print(len(set(posters.values())), f'{time.perf_counter() - t:.3f}s')
+    print()
+
+    # Test get_m_info_async()
+    for m in asyncio.run(get_m_info_async(start_url, 3, limit=3)):
+        print(m)
+    print()
+
+    # Test Fetcher (pooled keep-alive connections), shared by the sequential, concurrent and async crawls
+    with Fetcher(pool_size=3) as fetcher:
+        print(get_soup(start_url, fetcher).h3)
+        print(len(get_m_info(start_url, 3, fetcher=fetcher)))
+        print(len(get_m_info(start_url, 3, max_workers=3, fetcher=fetcher)))
+        print(len(asyncio.run(get_m_info_async(start_url, 3, limit=3, fetcher=fetcher))))
+    print()
+
+    # Test ResponseCache (the second crawl is served from the cache in data/http_cache)
+    with Fetcher(cache=ResponseCache(ttl=600)) as fetcher:
+        for _ in range(2):
+            t = time.perf_counter()
+            m_info = get_m_info(start_url, 3, fetcher=fetcher)
+            print(len(m_info), f'{time.perf_counter() - t:.3f}s')
+    print()
+
 
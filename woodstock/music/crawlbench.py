@@ -0,0 +1,140 @@
+"""End-to-end benchmarks of the crawler (crawl.py), run against a local stub IMDb server (util/stubserver.py)
+"""
+
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+from woodstock.music import crawl
+from woodstock.util import utility
+from woodstock.util.stubserver import StubIMDbServer
+
+MAX_WORKERS = 8
+
+# Each crawl variant gets a start URL, the max number of pages and a Fetcher, and returns an iterable of 4-tuples
+VARIANTS = {
+    'crawl': lambda url, n, f: (m for s in crawl.crawl(url, n) for m in crawl.get_m_info_from_soup(s, url)),
+    'crawl (prefetch)': lambda url, n, f: (m for s in crawl.crawl(url, n, f, prefetch=2)
+                                           for m in crawl.get_m_info_from_soup(s, url)),
+    'get_m_info': lambda url, n, f: crawl.get_m_info(url, n),
+    'get_m_info (Fetcher)': lambda url, n, f: crawl.get_m_info(url, n, fetcher=f),
+    'get_m_info (threads)': lambda url, n, f: crawl.get_m_info(url, n, max_workers=MAX_WORKERS, fetcher=f),
+    'get_m_info_multiprocess': lambda url, n, f: crawl.get_m_info_multiprocess(url, n, MAX_WORKERS, fetcher=f),
+    'get_m_info_async': lambda url, n, f: asyncio.run(crawl.get_m_info_async(url, n, MAX_WORKERS, f)),
+    'iter_m_info': lambda url, n, f: crawl.iter_m_info(url, n, f),
+    'iter_m_info_streamed': lambda url, n, f: crawl.iter_m_info_streamed(url, n, f),
+}
+
+# Each parser variant gets the HTML text of a page and returns its 4-tuples
+PARSERS = {
+    'html.parser': lambda html: crawl.get_m_info_from_soup(BeautifulSoup(html, 'html.parser')),
+    'html.parser (targeted)': lambda html: crawl.get_m_info_from_soup(
+        BeautifulSoup(html, 'html.parser', parse_only=crawl.M_INFO_STRAINER)),
+    f'{crawl.FAST_PARSER} (targeted)': lambda html: crawl.get_m_info_from_soup(
+        BeautifulSoup(html, crawl.FAST_PARSER, parse_only=crawl.M_INFO_STRAINER)),
+    'MInfoParser': lambda html: _feed(crawl.MInfoParser(), html),
+}
+
+
+def _feed(parser, html):
+    parser.feed(html)
+    parser.close()
+    return parser.pop_records()
+
+
+def run_variant(name, start_url, max_pages):
+    """Runs the crawl variant name and returns its measurements:
+    number of records, pages/sec, time to first record (ms), total time (s) and peak RSS (MB).
+    Meant to be run in a fresh process, so that the peak RSS belongs to this variant only.
+    """
+
+    with crawl.Fetcher(pool_size=MAX_WORKERS) as fetcher:
+        start = time.perf_counter()
+        records = iter(VARIANTS[name](start_url, max_pages, fetcher))
+        first = next(records, None)
+        first_record = time.perf_counter() - start
+        n = (first is not None) + sum(1 for _ in records)
+        seconds = time.perf_counter() - start
+    peak_rss = utility.get_peak_rss()
+    return {'variant': name, 'records': n, 'pages_per_sec': round(max_pages / seconds, 2),
+            'first_record_ms': round(first_record * 1000, 1), 'seconds': round(seconds, 3),
+            'peak_rss_mb': round(peak_rss / 2 ** 20, 1) if peak_rss else None}
+
+
+def run_parser(name, pages_html, repeat=3):
+    """Returns the average parse and extract time (ms/page) of the parser variant name over pages_html.
+    """
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages_html:
+            PARSERS[name](html)
+    ms_per_page = (time.perf_counter() - start) * 1000 / (repeat * len(pages_html))
+    return {'parser': name, 'parse_ms_per_page': round(ms_per_page, 2)}
+
+
+def run_benchmarks(max_pages=10, latency=0.05, bandwidth=None, per_page=50, fixtures_dir=None):
+    """Runs all the crawl variants (each one in a fresh process) and all the parser variants
+    against a StubIMDbServer with the given latency and bandwidth, and returns the results as a dict.
+    """
+
+    results = {'time': datetime.now().isoformat(timespec='seconds'),
+               'settings': {'max_pages': max_pages, 'latency': latency, 'bandwidth': bandwidth, 'per_page': per_page},
+               'crawl': [], 'parse': []}
+    with StubIMDbServer(latency=latency, bandwidth=bandwidth, per_page=per_page,
+                        total=per_page * max_pages, fixtures_dir=fixtures_dir) as server:
+        context = multiprocessing.get_context('spawn')
+        for name in VARIANTS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results['crawl'].append(executor.submit(run_variant, name, server.start_url, max_pages).result())
+        pages_html = [server.get_page(crawl.get_specific_page(server.start_url, page)).decode('utf-8')
+                      for page in range(1, max_pages + 1)]
+    for name in PARSERS:
+        results['parse'].append(run_parser(name, pages_html))
+    return results
+
+
+def save_results(results):
+    """Appends results to data/benchmarks/crawlbench.jsonl and returns the results of the previous run (or None).
+    """
+
+    results_file = utility.get_data_dir() / 'benchmarks' / 'crawlbench.jsonl'
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    previous = None
+    if results_file.exists():
+        lines = results_file.read_text(encoding='utf-8').splitlines()
+        previous = json.loads(lines[-1]) if lines else None
+    with results_file.open('a', encoding='utf-8') as f:
+        f.write(json.dumps(results) + '\n')
+    return previous
+
+
+def print_results(results, previous=None):
+    """Prints results as tables, with the change of pages/sec and ms/page relative to the previous run (if any).
+    """
+
+    before = {r['variant']: r for r in previous['crawl']} if previous else {}
+    print(f'{"variant":<24}{"records":>8}{"pages/s":>10}{"1st rec ms":>12}{"seconds":>9}{"RSS MB":>8}{"vs prev":>9}')
+    for r in results['crawl']:
+        change = f'{r["pages_per_sec"] / before[r["variant"]]["pages_per_sec"] - 1:+.0%}' \
+            if r['variant'] in before else ''
+        print(f'{r["variant"]:<24}{r["records"]:>8}{r["pages_per_sec"]:>10}{r["first_record_ms"]:>12}'
+              f'{r["seconds"]:>9}{str(r["peak_rss_mb"]):>8}{change:>9}')
+    print()
+    before = {r['parser']: r for r in previous['parse']} if previous else {}
+    print(f'{"parser":<24}{"ms/page":>10}{"vs prev":>9}')
+    for r in results['parse']:
+        change = f'{r["parse_ms_per_page"] / before[r["parser"]]["parse_ms_per_page"] - 1:+.0%}' \
+            if r['parser'] in before else ''
+        print(f'{r["parser"]:<24}{r["parse_ms_per_page"]:>10}{change:>9}')
+
+
+if __name__ == '__main__':
+
+    results = run_benchmarks(max_pages=10, latency=0.05, bandwidth=None)
+    print_results(results, save_results(results))
@@ -6,6 +6,7 @@ from woodstock.util import utility
 from woodstock.music.enums import Vocals, Instrument
 
 import json
+import pickle
 
 
 class Performer:
@@ -20,8 +21,13 @@ class Performer:
     - __eq__(self, other) is the equivalent of Java equals() and should be overridden in classes
     - data fields (instance variables)
     - methods - calling them by self.<method>(...) from the same class where they are defined
+    - __slots__ - the data fields are stored in fixed slots instead of a per-object __dict__,
+      which makes the objects much smaller, but new data fields cannot be added to them
     """
 
+    # '_Performer__name' is the mangled name of self.__name (the name property).
+    __slots__ = ('_Performer__name', 'is_band')
+
     def __init__(self, name, is_band=True):
         self.name = name
         self.is_band = is_band
@@ -78,6 +84,19 @@ class Performer:
             is_band = False
         return cls(name, is_band)
 
+    # Pickling and JSON encoding/decoding (the objects have no __dict__)
+    def __getstate__(self):
+        """Returns the data fields that are set, as a dictionary (like <object>.__dict__ without __slots__),
+        including the slots of the subclasses.
+        """
+
+        return {slot: getattr(self, slot)
+                for cls in reversed(type(self).__mro__) for slot in cls.__dict__.get('__slots__', ()) if hasattr(self, slot)}
+
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
 
 class PerformerEncoder(json.JSONEncoder):
     """JSON encoder for Performer objects.
@@ -86,7 +105,7 @@ class PerformerEncoder(json.JSONEncoder):
     def default(self, o):
         # recommendation: always use double quotes with JSON
         if isinstance(o, Performer):
-            return {"__Performer__": o.__dict__}
+            return {"__Performer__": o.__getstate__()}
         return {f"__{o.__class__.__name__}__": o.__dict__}
 
         # if isinstance(o, Performer):
@@ -98,18 +117,35 @@ def performer_json_to_py(performer_json):
     """
 
     if "__Performer__" in performer_json:
-        p = Performer('')
-        p.__dict__.update(performer_json["__Performer__"])
+        state = performer_json["__Performer__"]
+        # Decode into the class whose slots can hold the data fields (a Performer has no room for the others)
+        cls = SingerSongwriter if 'vocals' in state and 'instrument' in state else Singer if 'vocals' in state \
+            else Songwriter if 'instrument' in state else Performer
+        p = cls.__new__(cls)
+        p.__setstate__(state)
         return p
     return performer_json
 
 
-class Singer(Performer):
+class _RolePerformer(Performer):
+    """The common superclass of Singer and Songwriter, which holds the slots of both of them.
+    If Singer and Songwriter declared their own (non-empty) __slots__, SingerSongwriter could not inherit
+    from both of them (instance layout conflict); declaring the slots here (and not in Performer)
+    keeps Performer objects as small as possible, at the cost of a Singer carrying the unused slots of a Songwriter
+    and vice versa.
+    """
+
+    __slots__ = ('vocals', 'instrument', 'writes_songs')
+
+
+class Singer(_RolePerformer):
     """The class describing the concept of singer.
     It is assumed that a singer is sufficiently described as a Performer,
     with the addition of whether they are a lead or a background singer.
     """
 
+    __slots__ = ()                                          # vocals is declared in _RolePerformer.__slots__
+
     # # Version 1 - no multiple inheritance
     # def __init__(self, name, vocals, is_band=False):
     #     super().__init__(name, is_band=is_band)
@@ -138,12 +174,14 @@ class Singer(Performer):
         print(self.name + ' singing:', song_title + '...', ' '.join(args), ' '.join([v for k, v in kwargs.items()]))
 
 
-class Songwriter(Performer):
+class Songwriter(_RolePerformer):
     """The class describing the concept of songwriter.
     It is assumed that a songwriter is sufficiently described as a Performer
     who writes songs and plays an instrument.
     """
 
+    __slots__ = ()                                          # instrument, writes_songs are in _RolePerformer
+
     # # Version 1 - no multiple inheritance
     # def __init__(self, name, instrument, is_band=False):
     #     super().__init__(name, is_band=is_band)
@@ -174,6 +212,8 @@ class SingerSongwriter(Singer, Songwriter):
     It is assumed that a singer-songwriter is sufficiently described as a Singer who is simultaneously a Songwriter.
     """
 
+    __slots__ = ()
+
     # def __init__(self, name, vocals, **kwargs):
     #     super().__init__(name, vocals, **kwargs)
     def __init__(self, **kwargs):
@@ -217,7 +257,7 @@ if __name__ == "__main__":
     # print(jimiHendrix._Performer__n)
     print()
 
-    # Add new data fields (instance variables)
+    # Add new data fields (instance variables) - possible only for objects with a __dict__ (i.e. without __slots__)
     #   1. <object>.<new_attr> = <value>
     #   2. <object>.__setattr__('<new_attr>', <value>)      # counterpart: <object>.__getattribute__('<attr>')
     #   3. setattr(<object>, '<new_attr>', <value>))        # counterpart: getattr(<object>, '<attr>')
@@ -225,8 +265,12 @@ if __name__ == "__main__":
     # jimiHendrix.__setattr__('nationality', 'US')
     # print(jimiHendrix.nationality)
     # print(jimiHendrix.__getattribute__('nationality'))
-    setattr(jimiHendrix, 'nationality', 'US')
-    print(getattr(jimiHendrix, 'nationality'))
+    try:
+        setattr(jimiHendrix, 'nationality', 'US')
+    except AttributeError as e:
+        print(e)
+    setattr(jimiHendrix, 'is_band', False)
+    print(getattr(jimiHendrix, 'is_band'))
     print(getattr(jimiHendrix, 'name'))
     print()
 
@@ -244,7 +288,8 @@ if __name__ == "__main__":
     # - o.__dir__
 
     # Demonstrate object data fields and methods in Python Console for Performer objects
-    print(jimiHendrix.__dict__)
+    print(Performer.__slots__)
+    print(jimiHendrix.__getstate__())
     print(jimiHendrix.__dir__())
     print()
 
@@ -297,4 +342,49 @@ if __name__ == "__main__":
         print(p)
     print()
 
+    # Subclass objects (decoded into the subclass that has their data fields; the enums are not JSON-serializable)
+    joan_baez_json = json.dumps(Singer(name='Joan Baez', vocals=None, is_band=False), cls=PerformerEncoder, indent=4)
+    print(joan_baez_json)
+    p = json.loads(joan_baez_json, object_hook=performer_json_to_py)
+    print(p.__class__.__name__, p)
+    print()
+
+    # Demonstrate pickling of objects with __slots__
+    print(pickle.loads(pickle.dumps(arloGuthrie)).__getstate__())
+    print()
 
+    # Demonstrate the memory saved by __slots__ (bytes per object):
+    # the same classes without __slots__ (as before), vs. Performer and its subclasses
+    class DictPerformer:
+        def __init__(self, name, is_band=True):
+            self.name = name
+            self.is_band = is_band
+
+    class DictSinger(DictPerformer):
+        def __init__(self, vocals, **kwargs):
+            super().__init__(**kwargs)
+            self.vocals = vocals if isinstance(vocals, Vocals) else None
+
+    class DictSongwriter(DictPerformer):
+        def __init__(self, instrument, **kwargs):
+            super().__init__(**kwargs)
+            self.instrument = instrument
+            self.writes_songs = True
+
+    class DictSingerSongwriter(DictSinger, DictSongwriter):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+
+    # E.g., with Python 3.11: Performer 88 -> 48 bytes, Singer 96 -> 72, Songwriter 104 -> 72,
+    # SingerSongwriter 112 -> 72 (the subclasses share the slots of _RolePerformer)
+    for dict_class, slots_class, fields in [
+            (DictPerformer, Performer, dict(name='Melanie', is_band=False)),
+            (DictSinger, Singer, dict(name='Roger Daltrey', vocals=Vocals.LEAD_VOCALS, is_band=False)),
+            (DictSongwriter, Songwriter, dict(name='Pete Townshend', instrument=Instrument.LEAD_GUITAR,
+                                              is_band=False)),
+            (DictSingerSongwriter, SingerSongwriter, dict(name='Arlo Guthrie', vocals=Vocals.LEAD_VOCALS,
+                                                          is_band=False, instrument=Instrument.LEAD_GUITAR))]:
+        print(slots_class.__name__,
+              utility.get_bytes_per_instance(lambda: dict_class(**fields)),
+              utility.get_bytes_per_instance(lambda: slots_class(**fields)))
+    print()
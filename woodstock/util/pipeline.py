@@ -0,0 +1,206 @@
+"""Staged producer/consumer pipelines: stages of worker threads connected by bounded queues
+"""
+
+import queue
+import threading
+import time
+
+_DONE = object()                                            # end of the input of a stage
+
+
+class Stage:
+    """A stage of a Pipeline: workers threads apply function to the items of the stage's input queue,
+    and put the results into the input queue of the next stage (the results of the last stage are collected).
+    If fan_out is True, function returns an iterable, and each of its elements is passed on separately
+    (e.g., the 4-tuples of a page). queue_size is the capacity of the stage's input queue (default: 2 * workers);
+    when the queue is full, the previous stage waits (backpressure).
+    """
+
+    def __init__(self, name, function, workers=1, queue_size=None, fan_out=False):
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.queue_size = queue_size or 2 * workers
+        self.fan_out = fan_out
+        self.queue = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.queue = queue.Queue(self.queue_size)
+        self.processed = 0                                  # items taken from the input queue
+        self.produced = 0                                   # items passed on to the next stage
+        self.busy = 0.0                                     # seconds spent in function, summed over the workers
+        self.max_depth = 0
+        self._running = self.workers
+
+
+class Pipeline:
+    """Pipeline of Stages, e.g. fetch -> parse -> enrich -> persist, each one with its own number of worker threads,
+    connected by bounded queues. The pipeline can be cancelled (cancel()) at any time, e.g. from another thread
+    or from the report callback, or by setting cancel_event (a threading.Event owned by the caller, e.g. shared
+    by several pipelines; it is checked every 0.1 seconds); an exception raised in any stage cancels it as well.
+    If report is specified, it is called with stats() every report_interval seconds while the pipeline runs,
+    and once at the end.
+    """
+
+    def __init__(self, *stages, report=None, report_interval=1.0, cancel_event=None):
+        self.stages = list(stages)
+        self.report = report
+        self.report_interval = report_interval
+        self.cancel_event = cancel_event
+        self.cancelled = threading.Event()
+        self.error = None
+        self.start = self.end = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _put(self, stage, item):
+        """Puts item into stage's input queue, waiting while the queue is full; returns False if cancelled.
+        """
+
+        while not self.cancelled.is_set():
+            try:
+                stage.queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            with stage._lock:
+                stage.max_depth = max(stage.max_depth, stage.queue.qsize())
+            return True
+        return False
+
+    def _get(self, stage):
+        while not self.cancelled.is_set():
+            try:
+                return stage.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, error):
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.cancel()
+
+    def _feed(self, items):
+        try:
+            for item in items:
+                if not self._put(self.stages[0], item):
+                    return
+            self._put(self.stages[0], _DONE)
+        except Exception as e:
+            self._fail(e)
+
+    def _work(self, i, results):
+        stage = self.stages[i]
+        next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+        running = True
+        try:
+            while True:
+                item = self._get(stage)
+                if item is _DONE:
+                    with stage._lock:
+                        stage._running -= 1
+                        running = False
+                        others = stage._running
+                    if others:
+                        self._put(stage, _DONE)             # for the other workers of the stage
+                    break
+                start = time.perf_counter()
+                outputs = list(stage.function(item)) if stage.fan_out else [stage.function(item)]
+                with stage._lock:
+                    stage.processed += 1
+                    stage.produced += len(outputs)
+                    stage.busy += time.perf_counter() - start
+                for output in outputs:
+                    if next_stage is None:
+                        with self._lock:
+                            results.append(output)
+                    elif not self._put(next_stage, output):
+                        return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            with stage._lock:
+                if running:
+                    stage._running -= 1
+                last = stage._running == 0
+            if last and next_stage is not None:
+                self._put(next_stage, _DONE)
+
+    def run(self, items):
+        """Feeds items (any iterable, consumed lazily) to the first stage, waits until all of them have gone
+        through all the stages and returns the results of the last stage, in the order of completion.
+        If a stage raises an exception, the exception is re-raised here; if the pipeline is cancelled
+        (including by KeyboardInterrupt), the results completed so far are returned.
+        """
+
+        for stage in self.stages:
+            stage.reset()
+        self.cancelled.clear()
+        self.error = None
+        self.start, self.end = time.perf_counter(), None
+        results = []
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            threads.extend(threading.Thread(target=self._work, args=(i, results), daemon=True)
+                           for _ in range(stage.workers))
+        for thread in threads:
+            thread.start()
+        next_report = self.start + self.report_interval
+        try:
+            while True:
+                alive = [thread for thread in threads if thread.is_alive()]
+                if not alive:
+                    break
+                alive[-1].join(0.1)
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    self.cancel()
+                if self.report is not None and time.perf_counter() >= next_report:
+                    self.report(self.stats())
+                    next_report += self.report_interval
+        except KeyboardInterrupt:
+            self.cancel()
+            for thread in threads:
+                thread.join()
+        self.end = time.perf_counter()
+        if self.report is not None:
+            self.report(self.stats())
+        if self.error is not None:
+            raise self.error
+        return results
+
+    def stats(self):
+        """Returns the statistics of each stage so far, as a dictionary {stage name: statistics}:
+        workers, processed and produced items, throughput (processed items per second), busy seconds,
+        utilization (the fraction of the workers' time spent in the stage's function; the bottleneck stage
+        is the one with the highest utilization), and the current and max depth of the stage's input queue.
+        """
+
+        elapsed = max((self.end or time.perf_counter()) - self.start, 1e-9) if self.start is not None else None
+        stats = {}
+        for stage in self.stages:
+            with stage._lock:
+                stats[stage.name] = {
+                    'workers': stage.workers, 'processed': stage.processed, 'produced': stage.produced,
+                    'throughput': round(stage.processed / elapsed, 2) if elapsed else 0.0,
+                    'busy': round(stage.busy, 3),
+                    'utilization': round(stage.busy / (stage.workers * elapsed), 2) if elapsed else 0.0,
+                    'queue_depth': stage.queue.qsize(), 'max_queue_depth': stage.max_depth}
+        return stats
+
+
+if __name__ == '__main__':
+
+    def slow_square(x):
+        time.sleep(0.05)
+        return x * x
+
+    pipeline = Pipeline(Stage('split', lambda x: range(x, x + 3), fan_out=True),
+                        Stage('square', slow_square, workers=4),
+                        Stage('format', str),
+                        report=print, report_interval=0.2)
+    print(pipeline.run(range(0, 30, 3)))
@@ -0,0 +1,184 @@
+"""Local stand-in (stub) IMDb server, for running and benchmarking the crawler without network access
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+LIST_PATH = '/search/keyword/'
+START_QUERY = '?keywords=rock-%27n%27-roll%2Crock-music&ref_=kw_ref_key&mode=detail&page=1&sort=moviemeter,asc'
+
+
+def make_list_page(page=1, per_page=50, total=500):
+    """Returns the HTML text of a page of an IMDb movie list (keyword search, 'detail' mode),
+    with the same structure as the real pages: the 'desc' div with the total number of titles,
+    a 'lister-item' div for each movie (poster div and 'h3' header), and a 'Recently Viewed' 'h3' at the end.
+    """
+
+    first = (page - 1) * per_page + 1
+    last = min(page * per_page, total)
+    items = []
+    for i in range(first, last + 1):
+        items.append(f'''
+<div class="lister-item mode-detail">
+    <div class="lister-item-image ribbonize" data-tconst="tt{i:07d}">
+        <a href="/title/tt{i:07d}/"><img alt="Movie {i}" class="loadlate" loadlate="https://m.media-amazon.com/images/M/poster{i}._V1_UX67_CR0,0,67,98_AL_.jpg" src="https://m.media-amazon.com/images/G/01/imdb/images/nopicture/67x98/film-5.png" height="98" width="67"/></a>
+    </div>
+    <div class="lister-item-content">
+        <h3 class="lister-item-header">
+            <span class="lister-item-index unbold text-primary">{i}.</span>
+            <a href="/title/tt{i:07d}/">Rock Movie {i}</a>
+            <span class="lister-item-year text-muted unbold">({1950 + i % 70})</span>
+        </h3>
+        <p class="text-muted">Music documentary about rock 'n' roll, number {i}.</p>
+    </div>
+</div>''')
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Keyword Search - IMDb</title></head>
+<body>
+<div class="article">
+    <div class="desc"><span>{first}-{last} of {total:,} titles.</span></div>
+    <div class="lister-list">{''.join(items)}
+    </div>
+</div>
+<div id="rvi-div"><h3>Recently Viewed</h3></div>
+</body></html>
+'''
+
+
+def make_title_page(tconst):
+    """Returns the HTML text of a movie's IMDb page (tconst is the movie's id, e.g. 'tt0000001'),
+    with the movie's details (rating, runtime, genres,...) in a JSON-LD script, like in the real pages.
+    """
+
+    i = int(tconst[2:])
+    details = {'@context': 'http://schema.org', '@type': 'Movie', 'url': f'/title/{tconst}/',
+               'name': f'Rock Movie {i}', 'genre': ['Documentary', 'Music'][:1 + i % 2],
+               'duration': f'PT{1 + i % 2}H{i % 60}M',
+               'aggregateRating': {'@type': 'AggregateRating', 'ratingCount': 100 + i,
+                                   'ratingValue': f'{5 + i % 50 / 10:.1f}'}}
+    return f'''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Rock Movie {i} - IMDb</title>
+<script type="application/ld+json">{json.dumps(details)}</script>
+</head>
+<body><div class="title_wrapper"><h1>Rock Movie {i}</h1></div></body></html>
+'''
+
+
+class StubIMDbServer:
+    """Local HTTP server that serves IMDb movie list pages and movie pages (/title/<tconst>/), in a daemon thread.
+    The list pages are read from fixtures_dir (files named page_<n>.html, e.g. pages recorded from IMDb),
+    or generated by make_list_page() if there is no such a file.
+    Parameters:
+    - latency: the delay (in seconds) before each response is sent
+    - bandwidth: the max number of bytes per second sent in each response (None means unlimited)
+    - per_page, total: the number of movies per page and in the whole list (for the generated pages)
+    - fixtures_dir: the directory of the recorded pages (optional)
+    Can be used as a context manager; the number of requests served so far is in the requests field.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, per_page=50, total=500, fixtures_dir=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.per_page = per_page
+        self.total = total
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._httpd.server_port}/'
+
+    @property
+    def start_url(self):
+        return self.base_url.rstrip('/') + LIST_PATH + START_QUERY
+
+    def get_page(self, path):
+        """Returns the content (bytes) served for path (or for a complete URL), or None if there is no such a page.
+        """
+
+        url = urlsplit(path)
+        title = re.fullmatch(r'/title/(tt\d+)/', url.path)
+        if title:
+            return make_title_page(title.group(1)).encode('utf-8')
+        if url.path != LIST_PATH:
+            return None
+        page = int(parse_qs(url.query).get('page', ['1'])[-1])
+        fixture = self.fixtures_dir / f'page_{page}.html' if self.fixtures_dir else None
+        if fixture is not None and fixture.exists():
+            return fixture.read_bytes()
+        return make_list_page(page, self.per_page, self.total).encode('utf-8')
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'                       # keep-alive connections
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                content = server.get_page(self.path)
+                if content is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                server.send(self.wfile, content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def send(self, wfile, content):
+        """Writes content to wfile, at most bandwidth bytes per second (if bandwidth is specified).
+        """
+
+        if not self.bandwidth:
+            wfile.write(content)
+            return
+        chunk_size = max(1, int(self.bandwidth / 20))           # 20 chunks per second
+        for i in range(0, len(content), chunk_size):
+            wfile.write(content[i:i + chunk_size])
+            wfile.flush()
+            time.sleep(chunk_size / self.bandwidth)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+
+    # Serve the stub IMDb list pages until interrupted (Ctrl+C)
+    with StubIMDbServer(latency=0.1) as server:
+        print(server.start_url)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
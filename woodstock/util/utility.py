@@ -1,10 +1,24 @@
 """Utility functions of the package music
 """
 
+import os
+import sys
+import tracemalloc
 from enum import Enum
 from datetime import date, datetime
 from pathlib import Path
 
+try:
+    import resource                                         # Unix only
+except ImportError:
+    resource = None
+
+# psutil is optional; if it is installed, get_rss() works on all platforms, not only on Linux
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
 from woodstock.settings import *
 
 
@@ -45,6 +59,51 @@ def get_data_dir():
     return data_dir
 
 
+def get_peak_rss():
+    """Returns the peak resident set size (RSS) of the current process in bytes, or None if it is not available.
+    Uses resource.getrusage(), which reports ru_maxrss in kilobytes on Linux and in bytes on macOS.
+    """
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_rss():
+    """Returns the current resident set size (RSS) of the current process in bytes, or None if it is not available.
+    Reads /proc/self/statm on Linux; elsewhere, uses psutil if it is installed.
+    Never falls back to the peak RSS (get_peak_rss()), which does not go down when memory is released.
+    """
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    return psutil.Process().memory_info().rss if psutil is not None else None
+
+
+def get_bytes_per_instance(make, n=100000):
+    """Returns the average number of bytes allocated per object by make() (a function that creates an object),
+    measured by tracemalloc over n objects (the list that holds them is not counted).
+    """
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [None] * n
+    list_size = tracemalloc.get_traced_memory()[0] - before
+    for i in range(n):
+        objects[i] = make()
+    allocated = tracemalloc.get_traced_memory()[0] - before - list_size
+    del objects
+    if not tracing:
+        tracemalloc.stop()
+    return allocated / n
+
+
 if __name__ == '__main__':
 
 
@@ -85,3 +144,7 @@ if __name__ == '__main__':
     # Demonstrate get_project_dir(), get_data_dir()
     print('get_project_dir():', get_project_dir())
     print('get_data_dir():', get_data_dir())
+
+    # Demonstrate get_peak_rss()
+    print('get_peak_rss():', get_peak_rss())
+    print('get_rss():', get_rss())
@@ -0,0 +1,178 @@
+"""Persistent work queue in an SQLite database, shared by several worker processes (possibly on several hosts)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from woodstock.util import utility
+
+
+def default_owner():
+    """Returns the identifier of the current worker: '<host>:<process id>:<thread id>'.
+    """
+
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+class WorkQueue:
+    """Work queue of items (strings, e.g. URLs of pages to crawl), kept in an SQLite database file
+    (data/work_queue.sqlite by default), so that any number of worker processes can share it.
+    - a worker leases items (lease()); a leased item is invisible to the other workers for visibility_timeout seconds,
+      after which it is leased again to another worker (e.g., if the first one crashed); renew() extends a lease
+    - a worker completes an item (complete()) with its result; the completion is recorded exactly once,
+      and only if the worker still holds the lease, so the result of a worker whose lease expired is discarded
+    - an item that fails (release()) goes back to the queue, until it has been leased max_attempts times
+    - the pending items that turn out to be unnecessary (e.g., the pages beyond the end of a list) can be cancelled
+    All the state changes are made in 'BEGIN IMMEDIATE' transactions, i.e. under SQLite's write lock.
+    Note that SQLite locking over a network filesystem is only as reliable as that filesystem's file locks.
+    """
+
+    def __init__(self, file=None, visibility_timeout=300, max_attempts=3):
+        self.file = Path(file) if file else utility.get_data_dir() / 'work_queue.sqlite'
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()                     # sqlite3 connections cannot be shared by threads
+        with self._transaction() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS tasks (item TEXT PRIMARY KEY, state TEXT NOT NULL, '
+                       'owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0)')
+            db.execute('CREATE TABLE IF NOT EXISTS results (item TEXT PRIMARY KEY, owner TEXT NOT NULL, '
+                       'completed REAL NOT NULL, result TEXT)')
+            db.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires)')
+
+    def _connection(self):
+        if getattr(self._local, 'db', None) is None:
+            self._local.db = sqlite3.connect(str(self.file), timeout=60, isolation_level=None)
+        return self._local.db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def put(self, items):
+        """Adds items to the queue; the items already in the queue (in any state) are not added again.
+        """
+
+        with self._transaction() as db:
+            db.executemany("INSERT OR IGNORE INTO tasks (item, state) VALUES (?, 'pending')",
+                           [(item,) for item in items])
+
+    def lease(self, owner=None, n=1):
+        """Leases up to n items to owner (default: default_owner()) and returns them as a list.
+        The items are the pending ones and the leased ones whose leases have expired.
+        """
+
+        owner = owner or default_owner()
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE tasks SET state = 'failed' WHERE attempts >= ? AND "
+                       "(state = 'pending' OR (state = 'leased' AND lease_expires < ?))", (self.max_attempts, now))
+            items = [row[0] for row in db.execute(
+                "SELECT item FROM tasks WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY rowid LIMIT ?", (now, n))]
+            db.executemany("UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                           "WHERE item = ?", [(owner, now + self.visibility_timeout, item) for item in items])
+        return items
+
+    def renew(self, item, owner=None):
+        """Extends owner's lease of item by visibility_timeout seconds; returns False if owner no longer holds it.
+        """
+
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE tasks SET lease_expires = ? WHERE item = ? AND owner = ? AND state = 'leased'",
+                                (time.time() + self.visibility_timeout, item, owner or default_owner()))
+            return cursor.rowcount == 1
+
+    def complete(self, item, result, owner=None):
+        """Records result (anything that can be converted to JSON) as the result of item, if owner holds the lease
+        of item and item has not been completed before; returns True if the result is recorded, False otherwise.
+        """
+
+        owner = owner or default_owner()
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE tasks SET state = 'done', lease_expires = NULL "
+                                "WHERE item = ? AND owner = ? AND state = 'leased'", (item, owner))
+            if cursor.rowcount != 1:
+                return False
+            db.execute('INSERT INTO results (item, owner, completed, result) VALUES (?, ?, ?, ?)',
+                       (item, owner, time.time(), json.dumps(result)))
+            return True
+
+    def release(self, item, owner=None):
+        """Gives up owner's lease of item, which goes back to the queue (e.g., after an error).
+        """
+
+        with self._transaction() as db:
+            db.execute("UPDATE tasks SET state = 'pending', owner = NULL, lease_expires = NULL "
+                       "WHERE item = ? AND owner = ? AND state = 'leased'", (item, owner or default_owner()))
+
+    def pending(self):
+        """Returns the pending items (neither leased, nor completed, failed or cancelled), in the order of put().
+        """
+
+        return [row[0] for row in
+                self._connection().execute("SELECT item FROM tasks WHERE state = 'pending' ORDER BY rowid")]
+
+    def cancel(self, items):
+        """Cancels those of items that are still pending, so that they are never leased;
+        returns the number of items cancelled.
+        """
+
+        with self._transaction() as db:
+            cursor = db.executemany("UPDATE tasks SET state = 'cancelled' WHERE item = ? AND state = 'pending'",
+                                    [(item,) for item in items])
+            return cursor.rowcount
+
+    def counts(self):
+        """Returns the number of items in each state ('pending', 'leased', 'done', 'failed', 'cancelled')
+        as a dictionary.
+        """
+
+        counts = dict.fromkeys(['pending', 'leased', 'done', 'failed', 'cancelled'], 0)
+        counts.update(self._connection().execute('SELECT state, COUNT(*) FROM tasks GROUP BY state'))
+        return counts
+
+    def is_finished(self):
+        counts = self.counts()
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def results(self):
+        """Returns the results of the completed items as a dictionary {item: result}.
+        """
+
+        return {item: json.loads(result)
+                for item, result in self._connection().execute('SELECT item, result FROM results ORDER BY rowid')}
+
+    def close(self):
+        if getattr(self._local, 'db', None) is not None:
+            self._local.db.close()
+            self._local.db = None
+
+
+if __name__ == '__main__':
+
+    queue = WorkQueue(utility.get_data_dir() / 'work_queue_demo.sqlite', visibility_timeout=1)
+    queue.put(['a', 'b', 'c'])
+    print(queue.lease(owner='w1', n=2))
+    print(queue.complete('a', 'A', owner='w1'))
+    time.sleep(1.1)                                         # w1's lease of 'b' expires
+    print(queue.lease(owner='w2', n=2))
+    print(queue.complete('b', 'B1', owner='w1'))            # w1 no longer holds the lease of 'b'
+    print(queue.complete('b', 'B2', owner='w2'))
+    print(queue.counts())
+    print(queue.results())
+    queue.close()
+    (utility.get_data_dir() / 'work_queue_demo.sqlite').unlink()